@@ -1,28 +1,125 @@
 # 数据库连接和会话管理
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker
 from models import Base
+from services import derived_tables, sqlite_stats
+from functools import partial
+import anyio
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./ski_results.db")
+IS_SQLITE = DATABASE_URL.startswith("sqlite")
 
-engine = create_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# 同时在线程池中执行的数据库操作上限，以及排队等待的最长时间（秒）
+DB_MAX_CONCURRENCY = int(os.getenv("DB_MAX_CONCURRENCY", "8"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "30"))
+
+# 连接池：查询使用只读连接池，导入使用单连接的写入池（SQLite 同一时间只允许一个写入者）
+DB_READ_POOL_SIZE = int(os.getenv("DB_READ_POOL_SIZE", str(DB_MAX_CONCURRENCY)))
+DB_READ_MAX_OVERFLOW = int(os.getenv("DB_READ_MAX_OVERFLOW", "4"))
+DB_WRITE_POOL_SIZE = int(os.getenv("DB_WRITE_POOL_SIZE", "1"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+# SQLite 连接参数
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", str(64 * 1024)))
+
+def _configure_sqlite_connection(dbapi_connection, read_only: bool):
+    """每个新连接上设置 WAL 等参数；只读连接额外开启 query_only"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    # 负值表示以 KB 为单位
+    cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    if read_only:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+def _create_engine(read_only: bool):
+    if not IS_SQLITE:
+        return create_engine(DATABASE_URL, pool_pre_ping=True)
+
+    if read_only:
+        pool_args = {"pool_size": DB_READ_POOL_SIZE, "max_overflow": DB_READ_MAX_OVERFLOW}
+    else:
+        pool_args = {"pool_size": DB_WRITE_POOL_SIZE, "max_overflow": 0}
+    new_engine = create_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_timeout=DB_POOL_TIMEOUT,
+        **pool_args
+    )
+    event.listen(
+        new_engine, "connect",
+        lambda dbapi_connection, connection_record: _configure_sqlite_connection(dbapi_connection, read_only)
+    )
+    return new_engine
+
+# 写入（导入、迁移）
+engine = _create_engine(read_only=False)
+# 查询
+read_engine = _create_engine(read_only=True)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# 写入会话提交前刷新成绩单等派生表，再检查统计信息是否需要重新 ANALYZE
+derived_tables.install(SessionLocal)
+sqlite_stats.install(SessionLocal)
+
+_db_limiter = None
+
+class DatabaseBusyError(Exception):
+    """等待数据库执行名额超时"""
+
+def _get_db_limiter() -> anyio.CapacityLimiter:
+    # CapacityLimiter 需要在事件循环中创建
+    global _db_limiter
+    if _db_limiter is None:
+        _db_limiter = anyio.CapacityLimiter(DB_MAX_CONCURRENCY)
+    return _db_limiter
+
+async def run_db(func, *args, **kwargs):
+    """在线程池中执行同步的数据库操作，避免阻塞事件循环
+
+    同时执行的数据库操作不超过 DB_MAX_CONCURRENCY 个，
+    排队超过 DB_ACQUIRE_TIMEOUT 秒抛出 DatabaseBusyError。
+    """
+    limiter = _get_db_limiter()
+    try:
+        with anyio.fail_after(DB_ACQUIRE_TIMEOUT):
+            await limiter.acquire()
+    except TimeoutError:
+        raise DatabaseBusyError("数据库繁忙，请稍后重试")
+    try:
+        return await anyio.to_thread.run_sync(partial(func, *args, **kwargs))
+    finally:
+        limiter.release()
 
 def init_db():
-    """初始化数据库，创建所有表"""
+    """初始化数据库，创建所有表并执行未完成的结构迁移"""
+    from migrations import upgrade
     Base.metadata.create_all(bind=engine)
+    upgrade(engine)
 
 def get_db():
-    """获取数据库会话"""
+    """获取数据库会话（可写）"""
     db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_read_db():
+    """获取只读数据库会话，用于查询接口"""
+    db = ReadSessionLocal()
     try:
         yield db
     finally:
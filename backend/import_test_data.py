@@ -3,20 +3,20 @@
 """
 import os
 import sys
-import uuid
 from pathlib import Path
-from datetime import datetime
 
 sys.path.insert(0, str(Path(__file__).parent))
 
 from services.recognition_service import RecognitionService
+from services.import_service import write_structured_data
+from services.pdf_extraction import extract_pdf_texts
 from database import SessionLocal, init_db
-from models import Athlete, Organization, Competition, Event, Category, Result, GenderEnum
+from models import Athlete, Organization, Competition, Event, Category, Result
 from dotenv import load_dotenv
 
 load_dotenv()
 
-def import_file_to_db(file_path: str, db):
+def import_file_to_db(file_path: str, db, text: str = None):
     print(f"\n{'='*80}")
     print(f"导入文件: {os.path.basename(file_path)}")
     print(f"{'='*80}\n")
@@ -24,7 +24,8 @@ def import_file_to_db(file_path: str, db):
     recognition_service = RecognitionService()
     
     print("步骤 1: 提取 PDF 文本...")
-    text = recognition_service._extract_pdf_text(file_path)
+    if text is None:
+        text = recognition_service._extract_pdf_text(file_path)
     print(f"提取文本长度: {len(text)} 字符\n")
     
     print("步骤 2: 使用 Bedrock Claude 提取结构化数据...")
@@ -48,137 +49,9 @@ def import_file_to_db(file_path: str, db):
     print("步骤 3: 导入数据到数据库...")
     
     try:
-        comp_name = comp_data.get('name', '未知比赛')
-        comp_date_str = comp_data.get('date')
-        comp_date = None
-        if comp_date_str:
-            try:
-                comp_date = datetime.strptime(comp_date_str, '%Y-%m-%d').date()
-            except:
-                pass
-        
-        competition = db.query(Competition).filter(
-            Competition.name == comp_name
-        ).first()
-        
-        if not competition:
-            competition = Competition(
-                id=str(uuid.uuid4()),
-                name=comp_name,
-                date=comp_date,
-                location=comp_data.get('location', '北京'),
-                season=comp_data.get('season', '2025')
-            )
-            db.add(competition)
-            db.flush()
-            print(f"  创建比赛: {comp_name}")
-        else:
-            print(f"  使用现有比赛: {comp_name}")
-        
-        event_name = event_data.get('name', '大回转')
-        event = db.query(Event).filter(
-            Event.name == event_name,
-            Event.competition_id == competition.id
-        ).first()
-        
-        if not event:
-            event = Event(
-                id=str(uuid.uuid4()),
-                competition_id=competition.id,
-                name=event_name,
-                description=f"{event_name}项目"
-            )
-            db.add(event)
-            db.flush()
-            print(f"  创建项目: {event_name}")
-        else:
-            print(f"  使用现有项目: {event_name}")
-        
-        imported_count = 0
-        skipped_count = 0
-        
-        for result_data in results_data:
-            athlete_name = result_data.get('athlete_name')
-            if not athlete_name:
-                continue
-            
-            org_name = result_data.get('organization', '未知')
-            category_name = result_data.get('category', 'U11')
-            gender_str = result_data.get('gender', '女')
-            
-            organization = db.query(Organization).filter(
-                Organization.name == org_name
-            ).first()
-            
-            if not organization:
-                organization = Organization(
-                    id=str(uuid.uuid4()),
-                    name=org_name,
-                    type='俱乐部'
-                )
-                db.add(organization)
-                db.flush()
-            
-            athlete = db.query(Athlete).filter(
-                Athlete.name == athlete_name
-            ).first()
-            
-            if not athlete:
-                gender = GenderEnum.FEMALE if '女' in gender_str else GenderEnum.MALE
-                athlete = Athlete(
-                    id=str(uuid.uuid4()),
-                    name=athlete_name,
-                    gender=gender,
-                    organization_id=organization.id
-                )
-                db.add(athlete)
-                db.flush()
-            
-            gender = GenderEnum.FEMALE if '女' in gender_str else GenderEnum.MALE
-            category = db.query(Category).filter(
-                Category.name == category_name,
-                Category.gender == gender,
-                Category.event_id == event.id
-            ).first()
-            
-            if not category:
-                category = Category(
-                    id=str(uuid.uuid4()),
-                    event_id=event.id,
-                    name=category_name,
-                    gender=gender,
-                    description=f"{category_name} {gender_str}"
-                )
-                db.add(category)
-                db.flush()
-            
-            existing_result = db.query(Result).filter(
-                Result.athlete_id == athlete.id,
-                Result.competition_id == competition.id,
-                Result.event_id == event.id,
-                Result.category_id == category.id
-            ).first()
-            
-            if existing_result:
-                skipped_count += 1
-                continue
-            
-            from models import ResultStatusEnum
-            result = Result(
-                id=str(uuid.uuid4()),
-                athlete_id=athlete.id,
-                competition_id=competition.id,
-                event_id=event.id,
-                category_id=category.id,
-                rank=result_data.get('rank'),
-                run1_time=result_data.get('run1_time'),
-                run2_time=result_data.get('run2_time'),
-                total_time=result_data.get('total_time'),
-                time_behind_leader=result_data.get('time_behind_leader'),
-                status=ResultStatusEnum.COMPLETED
-            )
-            db.add(result)
-            imported_count += 1
+        counts = write_structured_data(db, structured_data)
+        imported_count = counts["imported"]
+        skipped_count = counts["skipped"]
         
         db.commit()
         
@@ -212,11 +85,15 @@ def main():
             "../test_files/s3_samples/高山滑雪大回转_U13_男子.pdf"
         ]
         
+        full_paths = [os.path.join(os.path.dirname(__file__), file_path) for file_path in test_files]
+        
+        # 所有文件的页面一起并行提取
+        texts = extract_pdf_texts([path for path in full_paths if os.path.exists(path)])
+        
         results = []
-        for file_path in test_files:
-            full_path = os.path.join(os.path.dirname(__file__), file_path)
+        for file_path, full_path in zip(test_files, full_paths):
             if os.path.exists(full_path):
-                success = import_file_to_db(full_path, db)
+                success = import_file_to_db(full_path, db, texts[full_path])
                 results.append((os.path.basename(file_path), success))
             else:
                 print(f"\n文件不存在: {file_path}")
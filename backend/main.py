@@ -1,7 +1,10 @@
 # FastAPI 主应用
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from database import init_db
+from fastapi.responses import JSONResponse
+from database import init_db, ReadSessionLocal, DatabaseBusyError
+from services.suggest_service import suggest_index
+from services.read_model import read_model, READ_MODEL_ENABLED
 import uvicorn
 
 app = FastAPI(
@@ -19,11 +22,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.exception_handler(DatabaseBusyError)
+async def database_busy_handler(request: Request, exc: DatabaseBusyError):
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 # 初始化数据库
 @app.on_event("startup")
 async def startup_event():
     init_db()
     print("✅ 数据库初始化完成")
+    db = ReadSessionLocal()
+    try:
+        suggest_index.sync(db)
+    finally:
+        db.close()
+    print(f"✅ 输入提示索引构建完成（{len(suggest_index)} 条）")
+    suggest_index.start(ReadSessionLocal)
+    if READ_MODEL_ENABLED:
+        read_model.rebuild()
+        print(f"✅ 内存读模型构建完成（{read_model.snapshot.size} 条成绩）")
 
 @app.get("/")
 async def root():
@@ -38,8 +55,9 @@ async def health_check():
     return {"status": "healthy"}
 
 # 导入路由
-from routes import results, import_data, statistics
+from routes import results, import_data, statistics, athletes
 app.include_router(results.router, prefix="/api/results", tags=["成绩查询"])
+app.include_router(athletes.router, prefix="/api/athletes", tags=["运动员"])
 app.include_router(import_data.router, prefix="/api/import", tags=["数据导入"])
 app.include_router(statistics.router, prefix="/api/statistics", tags=["统计分析"])
 
@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+数据库结构迁移
+
+create_all 只会创建缺失的表，无法为已有的 ski_results.db 补建索引或修改结构。
+这里按版本号顺序记录每一次结构变更，已执行的版本记录在 schema_migrations 表中。
+
+用法:
+    python migrations.py            # 升级到最新版本
+    python migrations.py status     # 查看当前版本和待执行的迁移
+    python migrations.py explain    # 输出每种查询形态的 EXPLAIN QUERY PLAN
+    python migrations.py reindex-names  # 重建名称全文索引（直接用 SQL 改动名称之后执行）
+    python migrations.py backfill-times # 全量重算成绩时间的百分之一秒列
+    python migrations.py rebuild-derived # 重建成绩单、运动员汇总、积分等派生表（直接用 SQL 改动成绩之后执行）
+    python migrations.py analyze        # 重新统计行数变化较大的表（直接用 SQL 导入大量数据之后执行）
+"""
+import sys
+from pathlib import Path
+from datetime import datetime, date
+from itertools import combinations
+from typing import List, Tuple
+
+from sqlalchemy import inspect, text
+
+sys.path.insert(0, str(Path(__file__).parent))
+
+from services import (
+    name_index, data_version, time_parser, derived_tables, sqlite_stats,
+    leaderboard_service, athlete_stats_service, organization_stats_service, rating_service,
+)
+
+
+def _create_name_indexes(conn):
+    """名称 n-gram 全文索引（仅 SQLite）"""
+    if conn.dialect.name != "sqlite":
+        return
+    for source in name_index.NAME_INDEXES:
+        for statement in name_index.create_statements(source):
+            conn.execute(text(statement))
+    name_index.rebuild(conn)
+
+
+def _recreate_name_indexes(conn):
+    """名称全文索引改为按主键关联：删除按 rowid 关联的旧表和触发器后重建（仅 SQLite）"""
+    if conn.dialect.name != "sqlite":
+        return
+    for source in name_index.NAME_INDEXES:
+        for statement in name_index.drop_statements(source):
+            conn.execute(text(statement))
+    _create_name_indexes(conn)
+
+
+def _create_generation_triggers(conn):
+    """数据版本号及其触发器（仅 SQLite）"""
+    if conn.dialect.name != "sqlite":
+        return
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS app_meta (key VARCHAR PRIMARY KEY, value INTEGER NOT NULL)"
+    ))
+    for statement in data_version.create_statements():
+        conn.execute(text(statement))
+
+
+def _add_time_columns(conn):
+    """成绩时间的百分之一秒列（新建的数据库已由 create_all 创建）并回填已有数据"""
+    existing = {column["name"] for column in inspect(conn).get_columns("results")}
+    for target in time_parser.TIME_COLUMNS.values():
+        if target not in existing:
+            conn.execute(text(f"ALTER TABLE results ADD COLUMN {target} INTEGER"))
+    time_parser.backfill(conn)
+
+
+def _create_leaderboards(conn):
+    """成绩单物化表（新建的数据库已由 create_all 创建）并按已有成绩填充"""
+    from models import LeaderboardEntry
+    LeaderboardEntry.__table__.create(conn, checkfirst=True)
+    leaderboard_service.rebuild_all(conn)
+
+
+def _create_athlete_stats(conn):
+    """运动员成绩汇总表（新建的数据库已由 create_all 创建）并按已有成绩填充"""
+    from models import AthleteStats, AthleteSeasonBest
+    AthleteStats.__table__.create(conn, checkfirst=True)
+    AthleteSeasonBest.__table__.create(conn, checkfirst=True)
+    athlete_stats_service.rebuild_all(conn)
+
+
+def _create_organization_places(conn):
+    """组织名次统计表（新建的数据库已由 create_all 创建）并按已有成绩填充"""
+    from models import OrganizationPlaces
+    OrganizationPlaces.__table__.create(conn, checkfirst=True)
+    organization_stats_service.rebuild_all(conn)
+
+
+def _create_rating_history(conn):
+    """运动员积分历史表（新建的数据库已由 create_all 创建）并全量计算"""
+    from models import AthleteRatingHistory
+    AthleteRatingHistory.__table__.create(conn, checkfirst=True)
+    rating_service.recompute(conn)
+
+
+# 每个迁移: (版本号, 说明, 步骤列表)；步骤为 SQL 字符串或接收 Connection 的函数
+MIGRATIONS = [
+    (1, "成绩查询索引", [
+        "CREATE INDEX IF NOT EXISTS ix_results_athlete_id ON results (athlete_id)",
+        "CREATE INDEX IF NOT EXISTS ix_results_competition_id ON results (competition_id)",
+        "CREATE INDEX IF NOT EXISTS ix_results_event_id ON results (event_id)",
+        "CREATE INDEX IF NOT EXISTS ix_results_category_competition_rank ON results (category_id, competition_id, rank)",
+        "CREATE INDEX IF NOT EXISTS ix_competitions_date_id ON competitions (date DESC, id)",
+        "CREATE INDEX IF NOT EXISTS ix_competitions_season_date ON competitions (season, date)",
+        "CREATE INDEX IF NOT EXISTS ix_events_name_competition ON events (name, competition_id)",
+        "CREATE INDEX IF NOT EXISTS ix_categories_name_event ON categories (name, event_id)",
+        "CREATE INDEX IF NOT EXISTS ix_athletes_organization_id ON athletes (organization_id)",
+        "ANALYZE",
+    ]),
+    (2, "运动员/组织名称 n-gram 全文索引", [_create_name_indexes]),
+    (3, "数据版本号触发器", [_create_generation_triggers]),
+    (4, "成绩时间数值列及索引", [
+        _add_time_columns,
+        "CREATE INDEX IF NOT EXISTS ix_results_category_total_time_cs ON results (category_id, total_time_cs)",
+        "CREATE INDEX IF NOT EXISTS ix_results_total_time_cs ON results (total_time_cs)",
+    ]),
+    (5, "成绩单物化表", [_create_leaderboards]),
+    (6, "运动员成绩汇总表", [_create_athlete_stats]),
+    (7, "组织名次统计表", [
+        _create_organization_places,
+        "CREATE INDEX IF NOT EXISTS ix_organization_places_competition "
+        "ON organization_competition_places (competition_id)",
+    ]),
+    (8, "运动员积分历史表", [
+        _create_rating_history,
+        "CREATE INDEX IF NOT EXISTS ix_rating_history_athlete_event_date "
+        "ON athlete_rating_history (athlete_id, event_type, date)",
+        "CREATE INDEX IF NOT EXISTS ix_rating_history_season_event ON athlete_rating_history (season, event_type)",
+        "CREATE INDEX IF NOT EXISTS ix_rating_history_date ON athlete_rating_history (date)",
+    ]),
+    (9, "成绩单按运动员索引", [
+        "CREATE INDEX IF NOT EXISTS ix_leaderboard_entries_athlete ON leaderboard_entries (athlete_id)",
+    ]),
+    (10, "名称全文索引按主键关联", [_recreate_name_indexes]),
+    (11, "运动员/组织按修改时间索引（输入提示增量同步）", [
+        "CREATE INDEX IF NOT EXISTS ix_athletes_updated_at ON athletes (updated_at)",
+        "CREATE INDEX IF NOT EXISTS ix_organizations_updated_at ON organizations (updated_at)",
+    ]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def _ensure_version_table(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_migrations ("
+        "version INTEGER PRIMARY KEY, "
+        "description VARCHAR NOT NULL, "
+        "applied_at DATETIME NOT NULL)"
+    ))
+
+
+def current_version(conn) -> int:
+    """当前数据库已执行到的迁移版本，未执行过任何迁移时为 0"""
+    _ensure_version_table(conn)
+    version = conn.execute(text("SELECT MAX(version) FROM schema_migrations")).scalar()
+    return version or 0
+
+
+def upgrade(engine) -> List[int]:
+    """执行所有未执行的迁移，每个版本单独一个事务，返回本次执行的版本号"""
+    applied = []
+    with engine.begin() as conn:
+        version = current_version(conn)
+
+    for migration_version, description, steps in MIGRATIONS:
+        if migration_version <= version:
+            continue
+        with engine.begin() as conn:
+            for step in steps:
+                if callable(step):
+                    step(conn)
+                else:
+                    conn.execute(text(step))
+            conn.execute(
+                text("INSERT INTO schema_migrations (version, description, applied_at) "
+                     "VALUES (:version, :description, :applied_at)"),
+                {"version": migration_version, "description": description, "applied_at": datetime.utcnow()}
+            )
+        applied.append(migration_version)
+
+    # 迁移中的 ANALYZE 只反映执行时的数据量，每次启动时检查统计信息是否过时
+    with engine.begin() as conn:
+        sqlite_stats.refresh(conn)
+    return applied
+
+
+# explain 使用的示例过滤值，只影响执行计划的展示
+SAMPLE_FILTERS = {
+    "athlete_name": "知涵",
+    "event_type": "大回转",
+    "category": "U11",
+    "organization": "海淀",
+    "date_from": date(2025, 1, 1),
+    "date_to": date(2025, 12, 31),
+    "season": "2025",
+    "max_total_time": "0:00:50.00",
+}
+
+
+def _is_full_scan(detail: str) -> bool:
+    return detail.startswith("SCAN ") and "INDEX" not in detail
+
+
+def explain_search_shapes(db) -> List[Tuple[str, str, List[str]]]:
+    """对每一种过滤条件组合输出计数查询与分页查询的执行计划
+
+    返回 (过滤条件, 查询类型, 执行计划行) 列表。
+    """
+    from schemas import QueryParams
+    from services.query_service import QueryService
+
+    service = QueryService(db)
+    dialect = db.get_bind().dialect
+    reports = []
+
+    names = list(SAMPLE_FILTERS)
+    for size in range(len(names) + 1):
+        for shape in combinations(names, size):
+            params = QueryParams(**{name: SAMPLE_FILTERS[name] for name in shape})
+            for kind, query in (("count", service.build_count_query(params)),
+                                ("page", service.build_page_query(params))):
+                sql = str(query.statement.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+                plan = db.execute(text("EXPLAIN QUERY PLAN " + sql)).fetchall()
+                reports.append((",".join(shape) or "(无过滤)", kind, [row[-1] for row in plan]))
+
+    return reports
+
+
+def main():
+    from database import engine, SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "upgrade"
+
+    if command == "status":
+        with engine.begin() as conn:
+            version = current_version(conn)
+        print(f"当前版本: {version}，最新版本: {LATEST_VERSION}")
+        for migration_version, description, _ in MIGRATIONS:
+            mark = "已执行" if migration_version <= version else "待执行"
+            print(f"  [{mark}] {migration_version}: {description}")
+
+    elif command == "upgrade":
+        applied = upgrade(engine)
+        if applied:
+            print(f"已执行迁移: {', '.join(str(v) for v in applied)}")
+        else:
+            print("数据库已是最新版本")
+
+    elif command == "explain":
+        db = SessionLocal()
+        try:
+            full_scans = 0
+            for shape, kind, plan in explain_search_shapes(db):
+                print(f"\n[{kind}] {shape}")
+                for detail in plan:
+                    flag = "  <-- 全表扫描" if _is_full_scan(detail) else ""
+                    if flag:
+                        full_scans += 1
+                    print(f"    {detail}{flag}")
+            print(f"\n全表扫描: {full_scans} 处")
+        finally:
+            db.close()
+
+    elif command == "reindex-names":
+        with engine.begin() as conn:
+            name_index.rebuild(conn)
+        print("名称全文索引已重建")
+
+    elif command == "backfill-times":
+        with engine.begin() as conn:
+            updated = time_parser.backfill(conn, only_missing=False)
+        print(f"已重算 {updated} 条成绩的时间列")
+
+    elif command == "rebuild-derived":
+        with engine.begin() as conn:
+            derived_tables.rebuild_all(conn)
+        print("派生表已重建")
+
+    elif command == "analyze":
+        with engine.begin() as conn:
+            tables = sqlite_stats.refresh(conn)
+        print(f"已重新统计: {', '.join(tables)}" if tables else "统计信息无需更新")
+
+    else:
+        print(__doc__)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 # 数据库模型定义
-from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, String, Float, Integer, Date, DateTime, ForeignKey, Index, Enum as SQLEnum, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from services.time_parser import apply_time_columns
 import enum
 
 Base = declarative_base()
@@ -130,6 +131,11 @@ class Result(Base):
     total_time = Column(String, nullable=True)
     rank = Column(Integer, nullable=True)
     time_behind_leader = Column(String, nullable=True)
+    # 以上时间解析后的百分之一秒，写入时自动计算，用于在数据库中排序和比较
+    run1_time_cs = Column(Integer, nullable=True)
+    run2_time_cs = Column(Integer, nullable=True)
+    total_time_cs = Column(Integer, nullable=True)
+    time_behind_leader_cs = Column(Integer, nullable=True)
     status = Column(SQLEnum(ResultStatusEnum), nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -137,4 +143,121 @@ class Result(Base):
     athlete = relationship("Athlete", back_populates="results")
     competition = relationship("Competition", back_populates="results")
     event = relationship("Event", back_populates="results")
-    category = relationship("Category", back_populates="results")
\ No newline at end of file
+    category = relationship("Category", back_populates="results")
+
+@event.listens_for(Result, "before_insert")
+@event.listens_for(Result, "before_update")
+def _set_result_time_columns(mapper, connection, result):
+    """写入成绩前根据时间字符串计算百分之一秒列"""
+    apply_time_columns(result)
+
+class AppMeta(Base):
+    """应用元数据（键值对），如数据版本号"""
+    __tablename__ = "app_meta"
+    
+    key = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class LeaderboardEntry(Base):
+    """成绩单物化表：每个组别的成绩按名次顺序排列，由 services.leaderboard_service 维护"""
+    __tablename__ = "leaderboard_entries"
+    
+    category_id = Column(String, ForeignKey("categories.id"), primary_key=True)
+    position = Column(Integer, primary_key=True)
+    result_id = Column(String, ForeignKey("results.id"), nullable=False)
+    athlete_id = Column(String, ForeignKey("athletes.id"), nullable=False)
+    competition_id = Column(String, ForeignKey("competitions.id"), nullable=False)
+    event_id = Column(String, ForeignKey("events.id"), nullable=False)
+    rank = Column(Integer, nullable=True)
+    status = Column(SQLEnum(ResultStatusEnum), nullable=False)
+    run1_time = Column(String, nullable=True)
+    run2_time = Column(String, nullable=True)
+    total_time = Column(String, nullable=True)
+    time_behind_leader = Column(String, nullable=True)
+    run1_time_cs = Column(Integer, nullable=True)
+    run2_time_cs = Column(Integer, nullable=True)
+    total_time_cs = Column(Integer, nullable=True)
+    # 与本组别第一名总成绩的差距（百分之一秒）
+    behind_cs = Column(Integer, nullable=True)
+
+class AthleteStats(Base):
+    """运动员成绩汇总，由 services.athlete_stats_service 维护"""
+    __tablename__ = "athlete_stats"
+    
+    athlete_id = Column(String, ForeignKey("athletes.id"), primary_key=True)
+    starts = Column(Integer, nullable=False, default=0)
+    finishes = Column(Integer, nullable=False, default=0)
+    dnf_count = Column(Integer, nullable=False, default=0)
+    dsq_count = Column(Integer, nullable=False, default=0)
+    wins = Column(Integer, nullable=False, default=0)
+    podiums = Column(Integer, nullable=False, default=0)
+    best_rank = Column(Integer, nullable=True)
+    first_date = Column(Date, nullable=True)
+    last_date = Column(Date, nullable=True)
+
+class AthleteSeasonBest(Base):
+    """运动员各项目、各赛季的成绩汇总与最好成绩（season 为空串表示比赛未标注赛季）"""
+    __tablename__ = "athlete_season_bests"
+    
+    athlete_id = Column(String, ForeignKey("athletes.id"), primary_key=True)
+    event_type = Column(SQLEnum(EventTypeEnum), primary_key=True)
+    season = Column(String, primary_key=True)
+    starts = Column(Integer, nullable=False, default=0)
+    finishes = Column(Integer, nullable=False, default=0)
+    best_rank = Column(Integer, nullable=True)
+    best_total_time_cs = Column(Integer, nullable=True)
+    best_total_result_id = Column(String, ForeignKey("results.id"), nullable=True)
+    best_run1_time_cs = Column(Integer, nullable=True)
+    best_run2_time_cs = Column(Integer, nullable=True)
+
+class OrganizationPlaces(Base):
+    """各组织在每场比赛中获得第 1~8 名的次数，由 services.organization_stats_service 维护"""
+    __tablename__ = "organization_competition_places"
+    
+    organization_id = Column(String, ForeignKey("organizations.id"), primary_key=True)
+    competition_id = Column(String, ForeignKey("competitions.id"), primary_key=True)
+    starts = Column(Integer, nullable=False, default=0)
+    finishes = Column(Integer, nullable=False, default=0)
+    place_1 = Column(Integer, nullable=False, default=0)
+    place_2 = Column(Integer, nullable=False, default=0)
+    place_3 = Column(Integer, nullable=False, default=0)
+    place_4 = Column(Integer, nullable=False, default=0)
+    place_5 = Column(Integer, nullable=False, default=0)
+    place_6 = Column(Integer, nullable=False, default=0)
+    place_7 = Column(Integer, nullable=False, default=0)
+    place_8 = Column(Integer, nullable=False, default=0)
+
+class AthleteRatingHistory(Base):
+    """运动员积分历史：每条完赛成绩的积分及赛后积分，由 services.rating_service 维护"""
+    __tablename__ = "athlete_rating_history"
+    
+    result_id = Column(String, ForeignKey("results.id"), primary_key=True)
+    athlete_id = Column(String, ForeignKey("athletes.id"), nullable=False)
+    competition_id = Column(String, ForeignKey("competitions.id"), nullable=False)
+    season = Column(String, nullable=False)
+    event_type = Column(SQLEnum(EventTypeEnum), nullable=False)
+    date = Column(Date, nullable=False)
+    race_points = Column(Float, nullable=False)
+    penalty = Column(Float, nullable=False)
+    points = Column(Float, nullable=False)
+    rating = Column(Float, nullable=False)
+
+# 查询索引（已有数据库通过 migrations.py 补建，名称需保持一致）
+Index("ix_results_athlete_id", Result.athlete_id)
+Index("ix_results_competition_id", Result.competition_id)
+Index("ix_results_event_id", Result.event_id)
+Index("ix_results_category_competition_rank", Result.category_id, Result.competition_id, Result.rank)
+Index("ix_results_category_total_time_cs", Result.category_id, Result.total_time_cs)
+Index("ix_results_total_time_cs", Result.total_time_cs)
+Index("ix_competitions_date_id", Competition.date.desc(), Competition.id)
+Index("ix_competitions_season_date", Competition.season, Competition.date)
+Index("ix_events_name_competition", Event.name, Event.competition_id)
+Index("ix_categories_name_event", Category.name, Category.event_id)
+Index("ix_athletes_organization_id", Athlete.organization_id)
+Index("ix_athletes_updated_at", Athlete.updated_at)
+Index("ix_organizations_updated_at", Organization.updated_at)
+Index("ix_leaderboard_entries_athlete", LeaderboardEntry.athlete_id)
+Index("ix_organization_places_competition", OrganizationPlaces.competition_id)
+Index("ix_rating_history_athlete_event_date", AthleteRatingHistory.athlete_id, AthleteRatingHistory.event_type, AthleteRatingHistory.date)
+Index("ix_rating_history_season_event", AthleteRatingHistory.season, AthleteRatingHistory.event_type)
+Index("ix_rating_history_date", AthleteRatingHistory.date)
@@ -0,0 +1,15 @@
+# 运动员路由
+from fastapi import APIRouter, Query
+from services.suggest_service import suggest_index
+from schemas import SuggestItem
+from typing import List
+
+router = APIRouter()
+
+@router.get("/suggest", response_model=List[SuggestItem])
+def suggest(
+    q: str = Query(..., min_length=1, max_length=50, description="汉字、全拼或首字母前缀，如 姚知、yaozh、yzh"),
+    limit: int = Query(10, ge=1, le=50, description="最多返回条数")
+):
+    """运动员/组织输入提示（内存索引，不查询数据库）"""
+    return suggest_index.suggest(q, limit)
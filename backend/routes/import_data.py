@@ -1,6 +1,41 @@
-from fastapi import APIRouter
+# 数据导入路由
+from typing import List
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
+from anyio import to_thread
+from schemas import ImportJobResponse
+from services.import_jobs import import_jobs, ImportQueueFullError, UploadTooLargeError
 router = APIRouter()
 
-@router.post('/upload')
-async def upload_file():
-    return {'message': 'Upload endpoint'}
\ No newline at end of file
+ALLOWED_SUFFIXES = ('.pdf',)
+
+@router.post('/upload', response_model=ImportJobResponse, status_code=202)
+async def upload_file(file: UploadFile = File(...)):
+    """保存上传的成绩文件并创建后台导入任务，立即返回任务信息"""
+    filename = file.filename or ''
+    if not filename.lower().endswith(ALLOWED_SUFFIXES):
+        raise HTTPException(status_code=400, detail='只支持 PDF 文件')
+    try:
+        upload, size = await to_thread.run_sync(import_jobs.save_upload, file.file, filename)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if not size:
+        upload.unlink(missing_ok=True)
+        raise HTTPException(status_code=400, detail='文件为空')
+    try:
+        job = await to_thread.run_sync(import_jobs.submit, filename, upload)
+    except ImportQueueFullError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={'Retry-After': '10'})
+    return job.to_response()
+
+@router.get('/jobs', response_model=List[ImportJobResponse])
+async def list_jobs(limit: int = Query(50, ge=1, le=500)):
+    """最近的导入任务（新任务在前）"""
+    return [job.to_response() for job in import_jobs.list(limit)]
+
+@router.get('/jobs/{job_id}', response_model=ImportJobResponse)
+async def get_job(job_id: str):
+    """导入任务状态及各阶段进度、耗时"""
+    job = import_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail='导入任务不存在')
+    return job.to_response()
@@ -1,17 +1,21 @@
 # 成绩查询路由
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from database import get_db
-from services.query_service import QueryService
-from schemas import QueryParams, QueryResponse
+from database import get_read_db, run_db
+from services.query_service import QueryService, cache_stats, params_key, filter_key
+from services.export_service import export_results
+from services.leaderboard_service import get_leaderboard
+from services.time_parser import parse_time_cs
+from services.etag import conditional, not_modified, set_etag, NOT_MODIFIED
+from schemas import QueryParams, QueryResponse, BatchQueryRequest, BatchQueryResponse, FacetsResponse, LeaderboardResponse
+from models import EventTypeEnum, CategoryNameEnum, GenderEnum
 from typing import Optional
 from datetime import date
-import math
 
 router = APIRouter()
 
-@router.get("/search", response_model=QueryResponse)
-async def search_results(
+def filter_params(
     athlete_name: Optional[str] = Query(None, description="运动员姓名"),
     event_type: Optional[str] = Query(None, description="项目类型"),
     category: Optional[str] = Query(None, description="组别"),
@@ -19,12 +23,13 @@ async def search_results(
     date_from: Optional[date] = Query(None, description="开始日期"),
     date_to: Optional[date] = Query(None, description="结束日期"),
     season: Optional[str] = Query(None, description="赛季"),
-    page: int = Query(1, ge=1, description="页码"),
-    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
-):
-    """查询成绩"""
-    params = QueryParams(
+    max_total_time: Optional[str] = Query(None, description="总成绩不超过该时间，如 0:00:50.00"),
+    sort: str = Query("date", pattern="^(date|total_time)$", description="排序：date 按比赛日期倒序、total_time 按总成绩升序")
+) -> QueryParams:
+    """搜索与导出共用的过滤与排序条件"""
+    if max_total_time and parse_time_cs(max_total_time) is None:
+        raise HTTPException(status_code=400, detail="无效的时间格式")
+    return QueryParams(
         athlete_name=athlete_name,
         event_type=event_type,
         category=category,
@@ -32,19 +37,103 @@ async def search_results(
         date_from=date_from,
         date_to=date_to,
         season=season,
-        page=page,
-        page_size=page_size
+        max_total_time=max_total_time,
+        sort=sort
     )
+
+@router.get("/search", response_model=QueryResponse)
+async def search_results(
+    request: Request,
+    response: Response,
+    filters: QueryParams = Depends(filter_params),
+    page: int = Query(1, ge=1, description="页码"),
+    page_size: int = Query(20, ge=1, le=100, description="每页数量"),
+    cursor: Optional[str] = Query(None, description="分页游标（上一页返回的 next_cursor），传入时忽略 page"),
+    count: str = Query("exact", pattern="^(exact|estimate|none)$", description="总数计算方式：exact 精确、estimate 估算、none 不计算"),
+    db: Session = Depends(get_read_db)
+):
+    """查询成绩（支持 If-None-Match 条件请求）"""
+    params = filters.model_copy(update={
+        "page": page,
+        "page_size": page_size,
+        "cursor": cursor,
+        "count": count
+    })
     
-    query_service = QueryService(db)
-    results, total = query_service.search_results(params)
-    
-    total_pages = math.ceil(total / page_size) if total > 0 else 0
-    
-    return QueryResponse(
-        results=results,
-        total=total,
-        page=page,
-        page_size=page_size,
-        total_pages=total_pages
+    try:
+        # 估算的总数可能沿用旧版本的缓存值，同一 ETag 下响应不保证逐字节相同，使用弱 ETag
+        etag, result = await run_db(conditional, db, request, ("search", params_key(params)),
+                                    lambda generation: QueryService(db).search_results(params, generation),
+                                    count == "estimate")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    set_etag(response, etag)
+    return result
+
+@router.get("/facets", response_model=FacetsResponse)
+async def get_facets(
+    request: Request,
+    response: Response,
+    filters: QueryParams = Depends(filter_params),
+    db: Session = Depends(get_read_db)
+):
+    """按当前过滤条件统计项目、组别、组织、赛季、状态各取值的成绩数"""
+    etag, result = await run_db(conditional, db, request, ("facets", filter_key(filters)),
+                                lambda generation: QueryService(db).facets(filters, generation))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    set_etag(response, etag)
+    return result
+
+@router.get("/leaderboard", response_model=LeaderboardResponse)
+async def leaderboard(
+    request: Request,
+    response: Response,
+    competition_id: str = Query(..., description="比赛ID"),
+    event_type: EventTypeEnum = Query(..., description="项目类型"),
+    category: CategoryNameEnum = Query(..., description="组别"),
+    gender: GenderEnum = Query(..., description="性别"),
+    db: Session = Depends(get_read_db)
+):
+    """读取某个组别的完整成绩单（按名次排列）"""
+    key = (competition_id, event_type.name, category.name, gender.name)
+    etag, result = await run_db(conditional, db, request, ("leaderboard", key),
+                                lambda generation: get_leaderboard(db, competition_id, event_type, category, gender))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    if result is None:
+        raise HTTPException(status_code=404, detail="未找到该组别的成绩")
+    set_etag(response, etag)
+    return result
+
+@router.post("/batch", response_model=BatchQueryResponse)
+async def search_batch(request: BatchQueryRequest, db: Session = Depends(get_read_db)):
+    """批量查询成绩：在同一会话中执行，并尽量合并为少量 SQL"""
+    for params in request.queries:
+        if params.max_total_time and parse_time_cs(params.max_total_time) is None:
+            raise HTTPException(status_code=400, detail="无效的时间格式")
+    try:
+        responses = await run_db(QueryService(db).search_batch, request.queries)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return BatchQueryResponse(responses=responses)
+
+@router.get("/export")
+async def export(
+    filters: QueryParams = Depends(filter_params),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$", description="导出格式：ndjson 或 csv")
+):
+    """按查询条件流式导出全部成绩"""
+    media_type = "text/csv; charset=utf-8" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        export_results(filters, format),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="results.{format}"'}
     )
+
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """查询缓存命中、未命中、淘汰统计"""
+    return cache_stats()
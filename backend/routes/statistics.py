@@ -1,6 +1,126 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from database import get_read_db, run_db
+from services.etag import conditional, not_modified, set_etag, NOT_MODIFIED
+from services.athlete_stats_service import get_athlete_statistics as read_athlete_statistics
+from services.compare_service import compare_athletes
+from services.organization_stats_service import organization_table, parse_points
+from services.rating_service import rating_list, rating_history
+from services.trend_service import athlete_trend
+from models import EventTypeEnum
+from schemas import (
+    AthleteStatisticsResponse, CompareResponse, OrganizationTableResponse, RatingListResponse, RatingHistoryResponse,
+    AthleteTrendResponse,
+)
 router = APIRouter()
 
-@router.get('/athlete/{athlete_id}')
-async def get_athlete_statistics(athlete_id: str):
-    return {'message': 'Statistics endpoint'}
\ No newline at end of file
+@router.get('/athlete/{athlete_id}', response_model=AthleteStatisticsResponse)
+async def get_athlete_statistics(athlete_id: str, request: Request, response: Response, db: Session = Depends(get_read_db)):
+    """运动员统计：参赛/完赛/DNF/DSQ 次数、最好名次、各项目及各赛季最好成绩"""
+    etag, result = await run_db(conditional, db, request, ('athlete', athlete_id),
+                                lambda generation: read_athlete_statistics(db, athlete_id))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    if result is None:
+        raise HTTPException(status_code=404, detail='运动员不存在')
+    set_etag(response, etag)
+    return result
+
+@router.get('/compare', response_model=CompareResponse)
+async def compare(
+    request: Request,
+    response: Response,
+    athlete_ids: List[str] = Query(..., description='运动员ID，重复传入多个，如 ?athlete_ids=a&athlete_ids=b'),
+    db: Session = Depends(get_read_db)
+):
+    """运动员两两交手对比：同场次数、胜负、各轮平均差距、差距趋势"""
+    athlete_ids = list(dict.fromkeys(athlete_ids))
+    if not 2 <= len(athlete_ids) <= 50:
+        raise HTTPException(status_code=400, detail='请选择 2 到 50 名运动员')
+    etag, result = await run_db(conditional, db, request, ('compare', tuple(athlete_ids)),
+                                lambda generation: compare_athletes(db, athlete_ids))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    if result is None:
+        raise HTTPException(status_code=404, detail='运动员不存在')
+    set_etag(response, etag)
+    return result
+
+@router.get('/organizations', response_model=OrganizationTableResponse)
+async def organization_standings(
+    request: Request,
+    response: Response,
+    competition_id: Optional[str] = Query(None, description='比赛ID，不传时汇总全部比赛'),
+    season: Optional[str] = Query(None, description='赛季'),
+    points: Optional[str] = Query(None, description='第 1~8 名积分，逗号分隔，如 9,7,6,5,4,3,2,1'),
+    sort: str = Query('medals', pattern='^(medals|points)$', description='排序：medals 奖牌榜、points 团体积分'),
+    db: Session = Depends(get_read_db)
+):
+    """组织奖牌榜与团体积分（按比赛、赛季或全部比赛）"""
+    try:
+        points_table = parse_points(points)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='无效的积分表')
+
+    key = ('organizations', competition_id, season, tuple(points_table), sort)
+    etag, result = await run_db(conditional, db, request, key,
+                                lambda generation: organization_table(db, competition_id, season, points_table, sort))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    set_etag(response, etag)
+    return result
+
+@router.get('/ratings', response_model=RatingListResponse)
+async def ratings(
+    request: Request,
+    response: Response,
+    event_type: EventTypeEnum = Query(..., description='项目类型'),
+    season: Optional[str] = Query(None, description='赛季，不传时取最近的赛季'),
+    limit: int = Query(100, ge=1, le=1000, description='返回人数'),
+    db: Session = Depends(get_read_db)
+):
+    """运动员积分排名（积分越低越好）"""
+    etag, result = await run_db(conditional, db, request, ('ratings', event_type.name, season, limit),
+                                lambda generation: rating_list(db, event_type, season, limit))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    set_etag(response, etag)
+    return result
+
+@router.get('/athlete/{athlete_id}/ratings', response_model=RatingHistoryResponse)
+async def athlete_ratings(
+    athlete_id: str,
+    request: Request,
+    response: Response,
+    event_type: Optional[EventTypeEnum] = Query(None, description='项目类型'),
+    db: Session = Depends(get_read_db)
+):
+    """运动员积分历史"""
+    key = ('rating_history', athlete_id, event_type.name if event_type else None)
+    etag, result = await run_db(conditional, db, request, key, lambda generation: rating_history(db, athlete_id, event_type))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    set_etag(response, etag)
+    return result
+
+@router.get('/athlete/{athlete_id}/trend', response_model=AthleteTrendResponse)
+async def trend(
+    athlete_id: str,
+    request: Request,
+    response: Response,
+    event_type: Optional[EventTypeEnum] = Query(None, description='项目类型，不传时返回全部项目'),
+    bucket: str = Query('competition', pattern='^(competition|month|season)$', description='汇总粒度：competition 每场比赛、month 每月、season 每赛季'),
+    max_points: Optional[int] = Query(None, ge=3, le=1000, description='每条序列最多点数，超出时降采样'),
+    db: Session = Depends(get_read_db)
+):
+    """运动员成绩趋势：总成绩、落后第一名百分比、名次（用于趋势图）"""
+    key = ('trend', athlete_id, event_type.name if event_type else None, bucket, max_points)
+    etag, result = await run_db(conditional, db, request, key,
+                                lambda generation: athlete_trend(db, athlete_id, event_type, bucket, max_points))
+    if result is NOT_MODIFIED:
+        return not_modified(etag)
+    if result is None:
+        raise HTTPException(status_code=404, detail='运动员不存在')
+    set_etag(response, etag)
+    return result
@@ -1,7 +1,7 @@
 # Pydantic 模式定义
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional, List
-from datetime import date
+from datetime import date, datetime
 from enum import Enum
 
 class GenderEnum(str, Enum):
@@ -28,8 +28,12 @@ class QueryParams(BaseModel):
     date_from: Optional[date] = None
     date_to: Optional[date] = None
     season: Optional[str] = None
-    page: int = 1
-    page_size: int = 20
+    max_total_time: Optional[str] = None
+    sort: str = Field("date", pattern="^(date|total_time)$")
+    page: int = Field(1, ge=1)
+    page_size: int = Field(20, ge=1, le=100)
+    cursor: Optional[str] = None
+    count: str = Field("exact", pattern="^(exact|estimate|none)$")
 
 class ResultResponse(BaseModel):
     id: str
@@ -45,6 +49,7 @@ class ResultResponse(BaseModel):
     total_time: Optional[str]
     rank: Optional[int]
     time_behind_leader: Optional[str]
+    total_time_cs: Optional[int] = None
     status: str
 
     class Config:
@@ -52,7 +57,187 @@ class ResultResponse(BaseModel):
 
 class QueryResponse(BaseModel):
     results: List[ResultResponse]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
-    total_pages: int
\ No newline at end of file
+    total_pages: Optional[int]
+    total_is_estimate: bool = False
+    next_cursor: Optional[str] = None
+
+class SuggestItem(BaseModel):
+    id: str
+    name: str
+    type: str
+    organization_name: Optional[str] = None
+
+class BatchQueryRequest(BaseModel):
+    queries: List[QueryParams] = Field(..., min_length=1, max_length=20)
+
+class BatchQueryResponse(BaseModel):
+    responses: List[QueryResponse]
+
+class FacetCount(BaseModel):
+    value: Optional[str]
+    count: int
+
+class FacetsResponse(BaseModel):
+    event_type: List[FacetCount]
+    category: List[FacetCount]
+    organization: List[FacetCount]
+    season: List[FacetCount]
+    status: List[FacetCount]
+
+class LeaderboardEntryResponse(BaseModel):
+    position: int
+    result_id: str
+    athlete_id: str
+    athlete_name: str
+    organization_name: Optional[str]
+    rank: Optional[int]
+    status: str
+    run1_time: Optional[str]
+    run2_time: Optional[str]
+    total_time: Optional[str]
+    time_behind_leader: Optional[str]
+    total_time_cs: Optional[int]
+    behind_cs: Optional[int]
+
+class LeaderboardResponse(BaseModel):
+    competition_id: str
+    competition_name: str
+    competition_date: date
+    event_name: str
+    category_id: str
+    category_name: str
+    gender: str
+    entries: List[LeaderboardEntryResponse]
+
+class PerformanceBest(BaseModel):
+    event_type: str
+    season: Optional[str] = None
+    starts: int
+    finishes: int
+    best_rank: Optional[int]
+    best_total_time: Optional[str]
+    best_total_time_cs: Optional[int]
+    best_total_result_id: Optional[str] = None
+    best_run1_time_cs: Optional[int]
+    best_run2_time_cs: Optional[int]
+
+class AthleteStatisticsResponse(BaseModel):
+    athlete_id: str
+    athlete_name: str
+    organization_name: Optional[str]
+    starts: int
+    finishes: int
+    dnf_count: int
+    dsq_count: int
+    wins: int
+    podiums: int
+    best_rank: Optional[int]
+    first_date: Optional[date]
+    last_date: Optional[date]
+    event_bests: List[PerformanceBest]
+    season_bests: List[PerformanceBest]
+
+class CompareAthlete(BaseModel):
+    id: str
+    name: str
+    organization_name: Optional[str]
+
+class CompareResponse(BaseModel):
+    athletes: List[CompareAthlete]
+    races: List[List[int]]
+    wins: List[List[int]]
+    losses: List[List[int]]
+    avg_gap_run1_cs: List[List[Optional[float]]]
+    avg_gap_run2_cs: List[List[Optional[float]]]
+    avg_gap_total_cs: List[List[Optional[float]]]
+    gap_trend_cs_per_year: List[List[Optional[float]]]
+
+class OrganizationStanding(BaseModel):
+    organization_id: str
+    organization_name: str
+    gold: int
+    silver: int
+    bronze: int
+    top8: int
+    places: List[int]
+    starts: int
+    finishes: int
+    points: int
+
+class OrganizationTableResponse(BaseModel):
+    competition_id: Optional[str]
+    season: Optional[str]
+    points_table: List[int]
+    standings: List[OrganizationStanding]
+
+class RatingEntry(BaseModel):
+    rank: int
+    athlete_id: str
+    athlete_name: str
+    organization_name: Optional[str]
+    rating: float
+    results: int
+    last_date: date
+
+class RatingListResponse(BaseModel):
+    season: Optional[str]
+    event_type: str
+    ratings: List[RatingEntry]
+
+class RatingHistoryItem(BaseModel):
+    result_id: str
+    competition_id: str
+    competition_name: str
+    date: date
+    season: str
+    event_type: str
+    race_points: float
+    penalty: float
+    points: float
+    rating: float
+
+class RatingHistoryResponse(BaseModel):
+    athlete_id: str
+    history: List[RatingHistoryItem]
+
+class TrendPoint(BaseModel):
+    period: str
+    date: date
+    races: int
+    total_time_cs: Optional[float]
+    pct_behind: Optional[float]
+    best_rank: Optional[int]
+    avg_rank: Optional[float]
+
+class TrendSeries(BaseModel):
+    event_type: str
+    points: List[TrendPoint]
+
+class AthleteTrendResponse(BaseModel):
+    athlete_id: str
+    athlete_name: str
+    bucket: str
+    series: List[TrendSeries]
+
+class ImportStageResponse(BaseModel):
+    name: str
+    status: str
+    progress: float
+    detail: Optional[str]
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+    duration_seconds: Optional[float]
+
+class ImportJobResponse(BaseModel):
+    id: str
+    filename: str
+    status: str
+    created_at: datetime
+    finished_at: Optional[datetime]
+    stages: List[ImportStageResponse]
+    imported: Optional[int]
+    skipped: Optional[int]
+    error: Optional[str]
@@ -0,0 +1,177 @@
+# 运动员成绩汇总
+#
+# athlete_stats 保存每名运动员的参赛、完赛、DNF/DSQ、冠军、领奖台次数和最好名次，
+# athlete_season_bests 保存各项目、各赛季的最好总成绩和单轮成绩。
+# 导入时由 services.derived_tables 在同一事务中按被改动的运动员重算（只读取这些运动员的成绩），
+# 统计接口只按主键读取汇总表，不扫描成绩表。
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, insert, select
+
+from models import (
+    Result, Athlete, Competition, Event, Organization, AthleteStats, AthleteSeasonBest, ResultStatusEnum,
+)
+from schemas import AthleteStatisticsResponse, PerformanceBest
+from services.time_parser import format_time_cs
+
+# 一次重算的运动员数（IN 列表长度）
+REFRESH_CHUNK_SIZE = 500
+
+_SOURCE_COLUMNS = (
+    Result.id, Result.athlete_id, Result.status, Result.rank,
+    Result.run1_time_cs, Result.run2_time_cs, Result.total_time_cs,
+    Competition.date, Competition.season, Event.name.label("event_type"),
+)
+
+
+def _source_query():
+    return (
+        select(*_SOURCE_COLUMNS)
+        .join(Competition, Competition.id == Result.competition_id)
+        .join(Event, Event.id == Result.event_id)
+    )
+
+
+def _min(current, value):
+    if value is None:
+        return current
+    return value if current is None or value < current else current
+
+
+def _insert_aggregates(conn, rows):
+    stats = {}
+    bests = {}
+    for row in rows:
+        completed = row.status == ResultStatusEnum.COMPLETED
+        athlete = stats.setdefault(row.athlete_id, {
+            "athlete_id": row.athlete_id, "starts": 0, "finishes": 0, "dnf_count": 0, "dsq_count": 0,
+            "wins": 0, "podiums": 0, "best_rank": None, "first_date": None, "last_date": None,
+        })
+        athlete["starts"] += 1
+        athlete["finishes"] += completed
+        athlete["dnf_count"] += row.status == ResultStatusEnum.DNF
+        athlete["dsq_count"] += row.status == ResultStatusEnum.DSQ
+        if completed and row.rank is not None:
+            athlete["wins"] += row.rank == 1
+            athlete["podiums"] += row.rank <= 3
+            athlete["best_rank"] = _min(athlete["best_rank"], row.rank)
+        athlete["first_date"] = _min(athlete["first_date"], row.date)
+        if athlete["last_date"] is None or row.date > athlete["last_date"]:
+            athlete["last_date"] = row.date
+
+        key = (row.athlete_id, row.event_type, row.season or "")
+        best = bests.setdefault(key, {
+            "athlete_id": key[0], "event_type": key[1], "season": key[2], "starts": 0, "finishes": 0,
+            "best_rank": None, "best_total_time_cs": None, "best_total_result_id": None,
+            "best_run1_time_cs": None, "best_run2_time_cs": None,
+        })
+        best["starts"] += 1
+        if not completed:
+            continue
+        best["finishes"] += 1
+        best["best_rank"] = _min(best["best_rank"], row.rank)
+        if row.total_time_cs is not None and (best["best_total_time_cs"] is None
+                                              or row.total_time_cs < best["best_total_time_cs"]):
+            best["best_total_time_cs"] = row.total_time_cs
+            best["best_total_result_id"] = row.id
+        best["best_run1_time_cs"] = _min(best["best_run1_time_cs"], row.run1_time_cs)
+        best["best_run2_time_cs"] = _min(best["best_run2_time_cs"], row.run2_time_cs)
+
+    if stats:
+        conn.execute(insert(AthleteStats), list(stats.values()))
+    if bests:
+        conn.execute(insert(AthleteSeasonBest), list(bests.values()))
+
+
+def refresh(conn, athlete_ids: Iterable[str]):
+    """重算指定运动员的汇总；conn 可以是 Session 或 Connection"""
+    athlete_ids = sorted(set(athlete_ids))
+    for start in range(0, len(athlete_ids), REFRESH_CHUNK_SIZE):
+        chunk = athlete_ids[start:start + REFRESH_CHUNK_SIZE]
+        conn.execute(delete(AthleteStats).where(AthleteStats.athlete_id.in_(chunk)))
+        conn.execute(delete(AthleteSeasonBest).where(AthleteSeasonBest.athlete_id.in_(chunk)))
+        _insert_aggregates(conn, conn.execute(_source_query().where(Result.athlete_id.in_(chunk))))
+
+
+def rebuild_all(conn):
+    """按成绩表当前内容重算全部运动员汇总"""
+    conn.execute(delete(AthleteStats))
+    conn.execute(delete(AthleteSeasonBest))
+    _insert_aggregates(conn, conn.execute(_source_query()))
+
+
+def _best_response(event_type, season, starts, finishes, best_rank, best_total_time_cs,
+                   best_total_result_id, best_run1_time_cs, best_run2_time_cs) -> PerformanceBest:
+    return PerformanceBest(
+        event_type=event_type.value,
+        season=season,
+        starts=starts,
+        finishes=finishes,
+        best_rank=best_rank,
+        best_total_time=format_time_cs(best_total_time_cs),
+        best_total_time_cs=best_total_time_cs,
+        best_total_result_id=best_total_result_id,
+        best_run1_time_cs=best_run1_time_cs,
+        best_run2_time_cs=best_run2_time_cs
+    )
+
+
+def get_athlete_statistics(db, athlete_id: str) -> Optional[AthleteStatisticsResponse]:
+    """读取运动员统计，运动员不存在时返回 None；两条按主键的查询"""
+    athlete = db.execute(
+        select(Athlete.name, Organization.name.label("organization_name"), *AthleteStats.__table__.c)
+        .outerjoin(Organization, Organization.id == Athlete.organization_id)
+        .outerjoin(AthleteStats, AthleteStats.athlete_id == Athlete.id)
+        .where(Athlete.id == athlete_id)
+    ).first()
+    if athlete is None:
+        return None
+
+    season_rows = db.execute(
+        select(AthleteSeasonBest)
+        .where(AthleteSeasonBest.athlete_id == athlete_id)
+        .order_by(AthleteSeasonBest.event_type, AthleteSeasonBest.season.desc())
+    ).scalars().all()
+
+    season_bests = []
+    by_event = defaultdict(list)
+    for row in season_rows:
+        by_event[row.event_type].append(row)
+        season_bests.append(_best_response(
+            row.event_type, row.season or None, row.starts, row.finishes, row.best_rank,
+            row.best_total_time_cs, row.best_total_result_id, row.best_run1_time_cs, row.best_run2_time_cs
+        ))
+
+    # 各项目历史最好由各赛季汇总合并得到
+    event_bests = []
+    for event_type, rows in by_event.items():
+        best_total = min((row for row in rows if row.best_total_time_cs is not None),
+                         key=lambda row: row.best_total_time_cs, default=None)
+        event_bests.append(_best_response(
+            event_type, None,
+            sum(row.starts for row in rows),
+            sum(row.finishes for row in rows),
+            min((row.best_rank for row in rows if row.best_rank is not None), default=None),
+            best_total.best_total_time_cs if best_total else None,
+            best_total.best_total_result_id if best_total else None,
+            min((row.best_run1_time_cs for row in rows if row.best_run1_time_cs is not None), default=None),
+            min((row.best_run2_time_cs for row in rows if row.best_run2_time_cs is not None), default=None),
+        ))
+
+    return AthleteStatisticsResponse(
+        athlete_id=athlete_id,
+        athlete_name=athlete.name,
+        organization_name=athlete.organization_name,
+        starts=athlete.starts or 0,
+        finishes=athlete.finishes or 0,
+        dnf_count=athlete.dnf_count or 0,
+        dsq_count=athlete.dsq_count or 0,
+        wins=athlete.wins or 0,
+        podiums=athlete.podiums or 0,
+        best_rank=athlete.best_rank,
+        first_date=athlete.first_date,
+        last_date=athlete.last_date,
+        event_bests=event_bests,
+        season_bests=season_bests
+    )
@@ -0,0 +1,193 @@
+# 进程内缓存 / 磁盘缓存
+import json
+import os
+import tempfile
+import time
+from collections import OrderedDict
+from pathlib import Path
+from threading import Lock
+from typing import Any, Callable, Dict, Hashable, Optional
+
+
+class LRUCache:
+    """线程安全的 LRU 缓存
+
+    超过 maxsize 条或 max_bytes 字节（由 sizeof 估算）时淘汰最久未使用的条目，
+    设置 ttl 后条目在写入 ttl 秒后过期。命中、未命中、淘汰和过期次数记录在 stats() 中。
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None,
+                 max_bytes: Optional[int] = None, sizeof: Optional[Callable[[Any], int]] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        # key -> (value, 过期时间, 字节数)
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._lock = Lock()
+        # 键中带数据版本号的缓存记录当前版本号，见 advance_generation
+        self._generation: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                self._pop(key)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key: Hashable, value: Any):
+        size = self.sizeof(value) if self.sizeof else 0
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._pop(key)
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.maxsize or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._pop(next(iter(self._data)))
+                self.evictions += 1
+
+    def _pop(self, key: Hashable):
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def advance_generation(self, generation: int):
+        """数据版本号变大时清空缓存，旧版本的条目不再等到淘汰或过期才释放"""
+        with self._lock:
+            if self._generation is None or generation > self._generation:
+                self._data.clear()
+                self._bytes = 0
+                self._generation = generation
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class DiskCache:
+    """按内容哈希寻址的磁盘 JSON 缓存，跨进程、跨次运行共享
+
+    key 为十六进制哈希串，值保存在 directory/key[:2]/key.json，写入先写临时文件再改名。
+    命中时更新文件修改时间，目录总大小超过 max_bytes 时按修改时间删除最久未用的文件，
+    直到降到 max_bytes 的 90%。
+    """
+
+    def __init__(self, directory, max_bytes: int = 256 * 1024 * 1024):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._bytes: Optional[int] = None
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _files(self):
+        return self.directory.glob("*/*.json") if self.directory.exists() else []
+
+    def get(self, key: str, default: Any = None) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                value = json.load(f)
+            os.utime(path)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return default
+        with self._lock:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        data = json.dumps(value, ensure_ascii=False).encode("utf-8")
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        with self._lock:
+            old_size = path.stat().st_size if path.exists() else 0
+            os.replace(tmp, path)
+            if self._bytes is None:
+                self._bytes = sum(p.stat().st_size for p in self._files())
+            else:
+                self._bytes += len(data) - old_size
+            if self._bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        files = []
+        for p in self._files():
+            try:
+                stat = p.stat()
+            except OSError:
+                continue
+            files.append((stat.st_mtime, stat.st_size, p))
+        files.sort(key=lambda f: f[0])
+        self._bytes = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for _, size, p in files:
+            if self._bytes <= target:
+                break
+            try:
+                p.unlink()
+            except OSError:
+                continue
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            for p in self._files():
+                try:
+                    p.unlink()
+                except OSError:
+                    pass
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "bytes": self._bytes if self._bytes is not None else sum(p.stat().st_size for p in self._files()),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
@@ -0,0 +1,133 @@
+# 运动员对比（交手记录）
+#
+# 取所选运动员的全部成绩，按组别（比赛 + 项目 + 组别 + 性别）排成 组别 × 运动员 的矩阵，
+# 两两之间的同场次数、胜负、各轮平均差距和差距变化趋势全部用 NumPy 广播一次算出，
+# 40 人的队伍也只是几十万个元素的数组运算。
+from typing import List, Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from models import Result, Athlete, Competition, Organization, ResultStatusEnum
+from schemas import CompareAthlete, CompareResponse
+
+DAYS_PER_YEAR = 365.25
+
+
+def _matrix(values: np.ndarray, valid: np.ndarray) -> List[List[Optional[float]]]:
+    """转为 JSON 矩阵，无数据的位置为 None"""
+    rounded = np.round(values, 2)
+    return [[float(v) if ok else None for v, ok in zip(row, ok_row)] for row, ok_row in zip(rounded, valid)]
+
+
+def _pairwise_gap(times: np.ndarray):
+    """times: (组别, 运动员)，缺失为 NaN；返回两两差距 (组别, i, j) 及其有效掩码"""
+    gap = times[:, :, None] - times[:, None, :]
+    valid = ~np.isnan(gap)
+    return np.where(valid, gap, 0.0), valid
+
+
+def _mean_gap(times: np.ndarray):
+    gap, valid = _pairwise_gap(times)
+    counts = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = gap.sum(axis=0) / counts
+    return mean, counts > 0
+
+
+def compare_athletes(db, athlete_ids: List[str]) -> Optional[CompareResponse]:
+    """计算两两交手矩阵；有运动员不存在时返回 None
+
+    矩阵 [i][j] 为第 i 名相对第 j 名：wins 为 i 排在 j 之前的场次，
+    差距为 i 减 j 的百分之一秒（负数表示 i 更快），趋势为总成绩差距每年的变化量。
+    """
+    athletes = db.execute(
+        select(Athlete.id, Athlete.name, Organization.name.label("organization_name"))
+        .outerjoin(Organization, Organization.id == Athlete.organization_id)
+        .where(Athlete.id.in_(athlete_ids))
+    ).all()
+    by_id = {row.id: row for row in athletes}
+    if len(by_id) != len(athlete_ids):
+        return None
+
+    rows = db.execute(
+        select(Result.category_id, Result.athlete_id, Result.status,
+               Result.run1_time_cs, Result.run2_time_cs, Result.total_time_cs, Competition.date)
+        .join(Competition, Competition.id == Result.competition_id)
+        .where(Result.athlete_id.in_(athlete_ids))
+    ).all()
+
+    # 只保留至少两名所选运动员同场的组别
+    group_sizes = {}
+    for row in rows:
+        group_sizes[row.category_id] = group_sizes.get(row.category_id, 0) + 1
+    groups = {category_id: i for i, category_id in enumerate(
+        category_id for category_id, size in group_sizes.items() if size > 1
+    )}
+    athlete_index = {athlete_id: i for i, athlete_id in enumerate(athlete_ids)}
+    n = len(athlete_ids)
+    g = len(groups)
+
+    present = np.zeros((g, n), dtype=bool)
+    # 排名键：完赛为总成绩，未完赛为 +inf
+    order_key = np.full((g, n), np.inf)
+    run1 = np.full((g, n), np.nan)
+    run2 = np.full((g, n), np.nan)
+    total = np.full((g, n), np.nan)
+    ordinal = np.zeros(g)
+    for row in rows:
+        group = groups.get(row.category_id)
+        if group is None:
+            continue
+        i = athlete_index[row.athlete_id]
+        present[group, i] = True
+        ordinal[group] = row.date.toordinal()
+        if row.status != ResultStatusEnum.COMPLETED:
+            continue
+        if row.total_time_cs is not None:
+            order_key[group, i] = total[group, i] = row.total_time_cs
+        if row.run1_time_cs is not None:
+            run1[group, i] = row.run1_time_cs
+        if row.run2_time_cs is not None:
+            run2[group, i] = row.run2_time_cs
+
+    shared = present[:, :, None] & present[:, None, :]
+    races = shared.sum(axis=0)
+    wins = (shared & (order_key[:, :, None] < order_key[:, None, :])).sum(axis=0)
+
+    mean_run1, has_run1 = _mean_gap(run1)
+    mean_run2, has_run2 = _mean_gap(run2)
+    mean_total, has_total = _mean_gap(total)
+
+    # 总成绩差距对比赛日期的最小二乘斜率（日期减去最早一场，避免大数相减丢失精度）
+    gap, valid = _pairwise_gap(total)
+    days = ordinal - ordinal.min() if g else ordinal
+    x = np.where(valid, days[:, None, None], 0.0)
+    count = valid.sum(axis=0)
+    sum_x = x.sum(axis=0)
+    sum_y = gap.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        sxx = (x * x).sum(axis=0) - sum_x * sum_x / count
+        sxy = (x * gap).sum(axis=0) - sum_x * sum_y / count
+        slope = sxy / sxx * DAYS_PER_YEAR
+    has_slope = (count >= 2) & (sxx > 0)
+
+    np.fill_diagonal(races, 0)
+    np.fill_diagonal(wins, 0)
+    for mask in (has_run1, has_run2, has_total, has_slope):
+        np.fill_diagonal(mask, False)
+
+    return CompareResponse(
+        athletes=[
+            CompareAthlete(id=athlete_id, name=by_id[athlete_id].name,
+                           organization_name=by_id[athlete_id].organization_name)
+            for athlete_id in athlete_ids
+        ],
+        races=races.tolist(),
+        wins=wins.tolist(),
+        losses=wins.T.tolist(),
+        avg_gap_run1_cs=_matrix(mean_run1, has_run1),
+        avg_gap_run2_cs=_matrix(mean_run2, has_run2),
+        avg_gap_total_cs=_matrix(mean_total, has_total),
+        gap_trend_cs_per_year=_matrix(slope, has_slope)
+    )
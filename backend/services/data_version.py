@@ -0,0 +1,32 @@
+# 数据版本号
+#
+# app_meta 表中的 data_generation 在成绩相关表的每次写入时由触发器加一（迁移版本 3），
+# 命令行导入脚本、上传导入等任何写入路径都会使它变化。
+# 进程内的缓存和索引记录构建时的版本号，版本号变化即说明数据已被导入或修改。
+from sqlalchemy import text
+
+GENERATION_KEY = "data_generation"
+
+# 写入后需要使缓存失效的表
+TRACKED_TABLES = ("results", "athletes", "organizations", "competitions", "events", "categories")
+
+
+def create_statements() -> list:
+    """初始化版本号并为各表创建自增触发器的 SQL（SQLite）"""
+    bump = f"UPDATE app_meta SET value = value + 1 WHERE key = '{GENERATION_KEY}';"
+    statements = [f"INSERT OR IGNORE INTO app_meta (key, value) VALUES ('{GENERATION_KEY}', 0)"]
+    for table in TRACKED_TABLES:
+        for action in ("INSERT", "UPDATE", "DELETE"):
+            statements.append(
+                f"CREATE TRIGGER IF NOT EXISTS {table}_generation_{action.lower()} "
+                f"AFTER {action} ON {table} BEGIN {bump} END"
+            )
+    return statements
+
+
+def get_generation(db) -> int:
+    """读取当前数据版本号"""
+    value = db.execute(
+        text("SELECT value FROM app_meta WHERE key = :key"), {"key": GENERATION_KEY}
+    ).scalar()
+    return value or 0
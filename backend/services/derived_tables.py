@@ -0,0 +1,144 @@
+# 派生表维护
+#
+# 写入会话每次 flush 时记录被改动的成绩涉及的组别、运动员和比赛，提交前在同一事务中刷新
+# 对应的派生表（成绩单、运动员汇总等），派生数据与成绩一起提交或回滚。
+# 批量的 query(...).delete()/update() 不经过单个对象，发生时在提交前整表重建；
+# 直接执行的原始 SQL 不会被记录，之后需执行 python migrations.py rebuild-derived。
+from itertools import chain
+
+from sqlalchemy import event, inspect, select
+
+from models import Result, Athlete, Competition, Event, Category
+from services import leaderboard_service, athlete_stats_service, organization_stats_service, rating_service
+
+# 批量写入这些表时整表重建派生表
+_BULK_TRACKED = (Result, Athlete, Competition, Event, Category)
+
+_TOUCHED_KEY = "derived_tables.touched"
+
+
+class Touched:
+    """本事务中被改动的成绩涉及的范围"""
+
+    def __init__(self):
+        self.full = False
+        self.category_ids = set()
+        self.athlete_ids = set()
+        # 成绩有改动，或日期、赛季、项目等信息被修改的比赛
+        self.competition_ids = set()
+        # 所属组织被修改的运动员
+        self.moved_athlete_ids = set()
+        # 新增、修改、删除的比赛的日期（含修改前的日期），积分从最早的日期开始重算
+        self.dates = set()
+
+    def __bool__(self):
+        return self.full or bool(self.category_ids or self.athlete_ids
+                                 or self.competition_ids or self.moved_athlete_ids or self.dates)
+
+
+def _touched(session) -> Touched:
+    return session.info.setdefault(_TOUCHED_KEY, Touched())
+
+
+def _values(obj, attribute: str) -> set:
+    """属性的当前值以及本次 flush 前的旧值（成绩被移到其它组别时两边都要刷新）"""
+    history = inspect(obj).attrs[attribute].history
+    values = {getattr(obj, attribute)} | set(history.deleted or ())
+    values.discard(None)
+    return values
+
+
+def _after_flush(session, flush_context):
+    for obj in chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, Result):
+            touched = _touched(session)
+            touched.category_ids |= _values(obj, "category_id")
+            touched.athlete_ids |= _values(obj, "athlete_id")
+            touched.competition_ids |= _values(obj, "competition_id")
+        elif isinstance(obj, Competition):
+            touched = _touched(session)
+            touched.dates |= _values(obj, "date")
+            if obj in session.dirty:
+                touched.competition_ids.add(obj.id)
+        elif isinstance(obj, Event) and obj in session.dirty:
+            _touched(session).competition_ids |= _values(obj, "competition_id")
+        elif isinstance(obj, Athlete) and obj in session.dirty:
+            if inspect(obj).attrs.organization_id.history.has_changes():
+                _touched(session).moved_athlete_ids.add(obj.id)
+
+
+def _do_orm_execute(orm_execute_state):
+    if orm_execute_state.is_select:
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.class_ in _BULK_TRACKED:
+        _touched(orm_execute_state.session).full = True
+
+
+def rebuild_all(conn):
+    """按成绩表当前内容重建全部派生表"""
+    leaderboard_service.rebuild_all(conn)
+    athlete_stats_service.rebuild_all(conn)
+    organization_stats_service.rebuild_all(conn)
+    rating_service.recompute(conn)
+
+
+def _refresh(session, touched: Touched):
+    if touched.full:
+        rebuild_all(session)
+        return
+    leaderboard_service.refresh(session, touched.category_ids)
+
+    athlete_ids = set(touched.athlete_ids)
+    if touched.competition_ids:
+        athlete_ids.update(session.execute(
+            select(Result.athlete_id).where(Result.competition_id.in_(touched.competition_ids)).distinct()
+        ).scalars())
+    athlete_stats_service.refresh(session, athlete_ids)
+
+    competition_ids = set(touched.competition_ids)
+    if touched.moved_athlete_ids:
+        competition_ids.update(session.execute(
+            select(Result.competition_id).where(Result.athlete_id.in_(touched.moved_athlete_ids)).distinct()
+        ).scalars())
+    organization_stats_service.refresh(session, competition_ids)
+
+    dates = set(touched.dates)
+    if touched.competition_ids:
+        dates.update(session.execute(
+            select(Competition.date).where(Competition.id.in_(touched.competition_ids)).distinct()
+        ).scalars())
+    if dates:
+        rating_service.recompute(session, min(dates))
+
+
+def _before_commit(session):
+    session.flush()
+    touched = session.info.pop(_TOUCHED_KEY, None)
+    if touched:
+        _refresh(session, touched)
+
+
+def _after_rollback(session):
+    session.info.pop(_TOUCHED_KEY, None)
+
+
+# 需要旧值的属性：默认情况下对已过期（如提交后）的对象赋值不会加载旧值，
+# 成绩被移出的组别、比赛被改期前的日期就无从得知
+_ACTIVE_HISTORY = (Result.category_id, Result.athlete_id, Result.competition_id,
+                   Competition.date, Event.competition_id)
+
+
+def _on_set(target, value, oldvalue, initiator):
+    return value
+
+
+def install(session_factory):
+    """为写入会话注册派生表维护的事件"""
+    for attribute in _ACTIVE_HISTORY:
+        if not event.contains(attribute, "set", _on_set):
+            event.listen(attribute, "set", _on_set, active_history=True, retval=True)
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "do_orm_execute", _do_orm_execute)
+    event.listen(session_factory, "before_commit", _before_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
@@ -0,0 +1,49 @@
+# ETag 与条件请求
+#
+# ETag 由数据版本号和规范化的查询内容计算：版本号不变则同一查询的响应不变，
+# 客户端带 If-None-Match 轮询时可以在执行 SQL 和序列化之前直接返回 304。
+# 同一版本下响应内容可能不同的查询（count=estimate 的总数可能沿用旧版本的缓存值）使用弱 ETag。
+import hashlib
+from fastapi import Request, Response
+from services.data_version import get_generation
+
+CACHE_CONTROL = "no-cache"
+
+# conditional 在客户端缓存仍有效时返回的标记（与“结果不存在”的 None 区分）
+NOT_MODIFIED = object()
+
+
+def make_etag(generation: int, *parts, weak: bool = False) -> str:
+    """由数据版本号和查询内容生成 ETag（默认为强 ETag）"""
+    digest = hashlib.sha256(repr((generation,) + parts).encode("utf-8")).hexdigest()
+    return f'W/"{digest[:32]}"' if weak else f'"{digest[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """请求头 If-None-Match 是否包含该 ETag（If-None-Match 按弱比较，忽略 W/ 前缀）"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified(etag: str) -> Response:
+    """304 响应"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str):
+    """为正常响应设置 ETag，并要求客户端每次使用前重新验证"""
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
+
+
+def conditional(db, request: Request, key: tuple, compute, weak: bool = False):
+    """在工作线程中执行：客户端缓存仍有效时不执行查询，返回 (etag, NOT_MODIFIED)，
+    否则返回 (etag, compute(数据版本号))"""
+    generation = get_generation(db)
+    etag = make_etag(generation, *key, weak=weak)
+    if etag_matches(request, etag):
+        return etag, NOT_MODIFIED
+    return etag, compute(generation)
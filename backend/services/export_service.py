@@ -0,0 +1,67 @@
+# 成绩导出服务
+#
+# 按搜索条件流式导出全部成绩：使用 yield_per 分批从数据库游标读取列投影行，
+# 每批编码后立即输出，内存占用与导出的总行数无关。
+# 执行查询和读取每一批都通过 run_db 在线程池中进行，和其它接口共用 DB_MAX_CONCURRENCY 的名额，
+# 等待客户端读取时不占用名额。
+import csv
+import io
+import json
+import os
+from typing import AsyncIterator, Optional
+
+from database import ReadSessionLocal, run_db
+from schemas import QueryParams, ResultResponse
+from services.query_service import QueryService
+
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+EXPORT_FIELDS = list(ResultResponse.model_fields)
+
+
+def _row_values(row) -> dict:
+    values = dict(row._mapping)
+    for field in ("event_name", "category_name", "gender", "status"):
+        values[field] = values[field].value
+    values["competition_date"] = values["competition_date"].isoformat()
+    return values
+
+
+def _encode_ndjson(rows) -> str:
+    return "".join(json.dumps(_row_values(row), ensure_ascii=False) + "\n" for row in rows)
+
+
+def _encode_csv(rows) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    for row in rows:
+        writer.writerow(_row_values(row))
+    return buffer.getvalue()
+
+
+def _open(db, params: QueryParams):
+    statement = QueryService(db).build_ordered_query(params).statement
+    return db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE)).partitions()
+
+
+def _next_batch(batches, encode) -> Optional[str]:
+    rows = next(batches, None)
+    return None if rows is None else encode(rows)
+
+
+async def export_results(params: QueryParams, fmt: str) -> AsyncIterator[str]:
+    """按 fmt（ndjson 或 csv）逐批生成导出内容
+
+    生成器自己管理会话：响应开始流式输出时，路由依赖注入的会话可能已经关闭。
+    """
+    encode = _encode_csv if fmt == "csv" else _encode_ndjson
+    db = ReadSessionLocal()
+    try:
+        if fmt == "csv":
+            # 带 BOM，Excel 打开时可正确识别中文
+            yield "\ufeff" + ",".join(EXPORT_FIELDS) + "\r\n"
+        batches = await run_db(_open, db, params)
+        while (content := await run_db(_next_batch, batches, encode)) is not None:
+            yield content
+    finally:
+        db.close()
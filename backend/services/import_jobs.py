@@ -0,0 +1,231 @@
+# 后台导入任务
+#
+# 上传接口把文件分块写入磁盘（不超过 IMPORT_MAX_UPLOAD_BYTES，不把整个文件读入内存）并登记任务，
+# 立即返回任务ID；固定大小的线程池依次执行提取文本（extract）、识别结构化数据（recognize）、写入数据库（write）三个阶段，
+# 各阶段的状态、进度和耗时可通过任务状态接口查询。
+# SQLite 同一时间只允许一个写入者，写库阶段在任务之间串行执行。
+# 任务状态只保存在内存中（最近 IMPORT_JOB_HISTORY 个），服务重启后丢失，上传的文件保留在 IMPORT_UPLOAD_DIR。
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import BinaryIO, List, Optional, Tuple
+
+from schemas import ImportJobResponse, ImportStageResponse
+
+IMPORT_UPLOAD_DIR = Path(os.getenv("IMPORT_UPLOAD_DIR", "./uploads"))
+IMPORT_WORKERS = int(os.getenv("IMPORT_WORKERS", "2"))
+# 排队和执行中的任务上限，超出时拒绝上传
+IMPORT_MAX_PENDING = int(os.getenv("IMPORT_MAX_PENDING", "100"))
+IMPORT_JOB_HISTORY = int(os.getenv("IMPORT_JOB_HISTORY", "500"))
+IMPORT_MAX_UPLOAD_BYTES = int(os.getenv("IMPORT_MAX_UPLOAD_BYTES", str(50 * 1024 * 1024)))
+
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
+STAGES = ("extract", "recognize", "write")
+
+PENDING = "pending"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+class ImportQueueFullError(Exception):
+    """排队的导入任务过多"""
+
+
+class UploadTooLargeError(Exception):
+    """上传的文件超过 IMPORT_MAX_UPLOAD_BYTES"""
+
+
+class ImportStage:
+    def __init__(self, name: str):
+        self.name = name
+        self.status = PENDING
+        self.progress = 0.0
+        self.detail: Optional[str] = None
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self._started = 0.0
+        self.duration_seconds: Optional[float] = None
+
+    def start(self):
+        self.status = RUNNING
+        self.started_at = datetime.utcnow()
+        self._started = time.perf_counter()
+
+    def finish(self, status: str = SUCCEEDED, detail: Optional[str] = None):
+        self.status = status
+        if status == SUCCEEDED:
+            self.progress = 1.0
+        if detail is not None:
+            self.detail = detail
+        self.finished_at = datetime.utcnow()
+        self.duration_seconds = round(time.perf_counter() - self._started, 3)
+
+    def to_response(self) -> ImportStageResponse:
+        return ImportStageResponse(
+            name=self.name,
+            status=self.status,
+            progress=round(self.progress, 3),
+            detail=self.detail,
+            started_at=self.started_at,
+            finished_at=self.finished_at,
+            duration_seconds=self.duration_seconds
+        )
+
+
+class ImportJob:
+    def __init__(self, filename: str, path: Path, job_id: str):
+        self.id = job_id
+        self.filename = filename
+        self.path = path
+        self.status = PENDING
+        self.created_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.stages = OrderedDict((name, ImportStage(name)) for name in STAGES)
+        self.imported: Optional[int] = None
+        self.skipped: Optional[int] = None
+        self.error: Optional[str] = None
+
+    def to_response(self) -> ImportJobResponse:
+        return ImportJobResponse(
+            id=self.id,
+            filename=self.filename,
+            status=self.status,
+            created_at=self.created_at,
+            finished_at=self.finished_at,
+            stages=[stage.to_response() for stage in self.stages.values()],
+            imported=self.imported,
+            skipped=self.skipped,
+            error=self.error
+        )
+
+
+class ImportJobQueue:
+    def __init__(self, workers: int = IMPORT_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="import")
+        self._jobs: "OrderedDict[str, ImportJob]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._active = 0
+
+    def save_upload(self, source: BinaryIO, filename: str) -> Tuple[Path, int]:
+        """把上传的文件分块写入 IMPORT_UPLOAD_DIR，返回 (文件路径, 字节数)
+
+        超过 IMPORT_MAX_UPLOAD_BYTES 时删除已写入的部分并抛出 UploadTooLargeError。
+        """
+        IMPORT_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+        path = IMPORT_UPLOAD_DIR / f"{uuid.uuid4()}{Path(filename).suffix.lower()}.part"
+        size = 0
+        try:
+            with open(path, "wb") as f:
+                for chunk in iter(lambda: source.read(UPLOAD_CHUNK_BYTES), b""):
+                    size += len(chunk)
+                    if size > IMPORT_MAX_UPLOAD_BYTES:
+                        raise UploadTooLargeError(f"文件超过 {IMPORT_MAX_UPLOAD_BYTES // (1024 * 1024)} MB")
+                    f.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path, size
+
+    def submit(self, filename: str, upload: Path) -> ImportJob:
+        """为 save_upload 保存的文件登记任务；队列已满时删除该文件"""
+        with self._lock:
+            if self._active >= IMPORT_MAX_PENDING:
+                upload.unlink(missing_ok=True)
+                raise ImportQueueFullError("导入任务过多，请稍后再试")
+            self._active += 1
+
+        try:
+            job_id = str(uuid.uuid4())
+            path = IMPORT_UPLOAD_DIR / f"{job_id}{Path(filename).suffix.lower()}"
+            upload.replace(path)
+            job = ImportJob(filename, path, job_id)
+            self._executor.submit(self._run, job)
+        except BaseException:
+            # 任务没有进入线程池，_run 不会释放名额
+            with self._lock:
+                self._active -= 1
+            raise
+
+        with self._lock:
+            self._jobs[job.id] = job
+            while len(self._jobs) > IMPORT_JOB_HISTORY:
+                oldest = next(iter(self._jobs.values()))
+                if oldest.status in (PENDING, RUNNING):
+                    break
+                self._jobs.popitem(last=False)
+        return job
+
+    def get(self, job_id: str) -> Optional[ImportJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self, limit: int = 50) -> List[ImportJob]:
+        with self._lock:
+            return list(reversed(self._jobs.values()))[:limit]
+
+    def _run(self, job: ImportJob):
+        job.status = RUNNING
+        stage = None
+        try:
+            from database import SessionLocal
+            from services.recognition_service import RecognitionService
+            from services.import_service import write_structured_data
+            from services.pdf_extraction import iter_pdf_pages, join_pages
+
+            recognition_service = RecognitionService()
+
+            stage = job.stages["extract"]
+            stage.start()
+            pages = []
+            for _, page, page_count, page_text in iter_pdf_pages([str(job.path)]):
+                pages.append(page_text)
+                stage.progress = (page + 1) / page_count
+            text = join_pages(pages)
+            stage.finish(detail=f"{len(pages)} 页，{len(text)} 字符")
+
+            stage = job.stages["recognize"]
+            stage.start()
+            structured_data = recognition_service._extract_structured_data(text)
+            if "error" in structured_data:
+                raise RuntimeError(structured_data["error"])
+            stage.finish(detail=f"{len(structured_data.get('results', []))} 条成绩")
+
+            stage = job.stages["write"]
+            stage.start()
+            with self._write_lock:
+                db = SessionLocal()
+                try:
+                    counts = write_structured_data(db, structured_data)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                finally:
+                    db.close()
+            job.imported = counts["imported"]
+            job.skipped = counts["skipped"]
+            stage.finish(detail=f"新增 {job.imported} 条，跳过 {job.skipped} 条")
+
+            job.status = SUCCEEDED
+        except Exception as e:
+            traceback.print_exc()
+            job.status = FAILED
+            job.error = str(e)
+            if stage is not None:
+                stage.finish(FAILED, str(e))
+        finally:
+            job.finished_at = datetime.utcnow()
+            with self._lock:
+                self._active -= 1
+
+
+import_jobs = ImportJobQueue()
@@ -0,0 +1,121 @@
+# 成绩导入写库
+#
+# 把识别得到的结构化数据（competition / event / results）写入数据库。
+# 组织、运动员、组别和已有成绩都按名称批量查询一次，新对象一次 flush，
+# 写入的条数与查询次数无关。命令行导入和后台导入任务共用这里的逻辑。
+import uuid
+from datetime import datetime
+from typing import Dict
+
+from models import Athlete, Organization, Competition, Event, Category, Result, GenderEnum, ResultStatusEnum
+
+
+def _gender(value: str) -> GenderEnum:
+    return GenderEnum.FEMALE if '女' in (value or '') else GenderEnum.MALE
+
+
+def write_structured_data(db, structured_data: Dict) -> Dict[str, int]:
+    """写入一份识别结果（不提交），返回 {"imported": 新增成绩数, "skipped": 跳过的重复成绩数}"""
+    comp_data = structured_data.get('competition', {})
+    event_data = structured_data.get('event', {})
+    results_data = [r for r in structured_data.get('results', []) if r.get('athlete_name')]
+
+    comp_name = comp_data.get('name', '未知比赛')
+    comp_date = None
+    if comp_data.get('date'):
+        try:
+            comp_date = datetime.strptime(comp_data['date'], '%Y-%m-%d').date()
+        except ValueError:
+            pass
+
+    competition = db.query(Competition).filter(Competition.name == comp_name).first()
+    if not competition:
+        competition = Competition(
+            id=str(uuid.uuid4()),
+            name=comp_name,
+            date=comp_date,
+            location=comp_data.get('location', '北京'),
+            season=comp_data.get('season', '2025')
+        )
+        db.add(competition)
+
+    event_name = event_data.get('name', '大回转')
+    event = db.query(Event).filter(Event.name == event_name, Event.competition_id == competition.id).first()
+    if not event:
+        event = Event(
+            id=str(uuid.uuid4()),
+            competition_id=competition.id,
+            name=event_name,
+            description=f"{event_name}项目"
+        )
+        db.add(event)
+
+    org_names = {r.get('organization', '未知') for r in results_data}
+    organizations = {o.name: o for o in db.query(Organization).filter(Organization.name.in_(org_names))}
+    athlete_names = {r['athlete_name'] for r in results_data}
+    athletes = {a.name: a for a in db.query(Athlete).filter(Athlete.name.in_(athlete_names))}
+    categories = {(c.name.value, c.gender): c for c in db.query(Category).filter(Category.event_id == event.id)}
+    existing = set(db.query(Result.athlete_id, Result.category_id).filter(
+        Result.competition_id == competition.id,
+        Result.event_id == event.id
+    ).all())
+
+    imported = 0
+    skipped = 0
+    for result_data in results_data:
+        org_name = result_data.get('organization', '未知')
+        category_name = result_data.get('category', 'U11')
+        gender_str = result_data.get('gender', '女')
+        gender = _gender(gender_str)
+
+        organization = organizations.get(org_name)
+        if not organization:
+            organization = Organization(id=str(uuid.uuid4()), name=org_name, type='俱乐部')
+            db.add(organization)
+            organizations[org_name] = organization
+
+        athlete = athletes.get(result_data['athlete_name'])
+        if not athlete:
+            athlete = Athlete(
+                id=str(uuid.uuid4()),
+                name=result_data['athlete_name'],
+                gender=gender,
+                organization_id=organization.id
+            )
+            db.add(athlete)
+            athletes[athlete.name] = athlete
+
+        category = categories.get((category_name, gender))
+        if not category:
+            category = Category(
+                id=str(uuid.uuid4()),
+                event_id=event.id,
+                name=category_name,
+                gender=gender,
+                description=f"{category_name} {gender_str}"
+            )
+            db.add(category)
+            categories[(category_name, gender)] = category
+
+        if (athlete.id, category.id) in existing:
+            skipped += 1
+            continue
+        existing.add((athlete.id, category.id))
+
+        db.add(Result(
+            id=str(uuid.uuid4()),
+            athlete_id=athlete.id,
+            competition_id=competition.id,
+            event_id=event.id,
+            category_id=category.id,
+            rank=result_data.get('rank'),
+            run1_time=result_data.get('run1_time'),
+            run2_time=result_data.get('run2_time'),
+            total_time=result_data.get('total_time'),
+            time_behind_leader=result_data.get('time_behind_leader'),
+            status=ResultStatusEnum.COMPLETED
+        ))
+        imported += 1
+
+    db.flush()
+    return {"imported": imported, "skipped": skipped}
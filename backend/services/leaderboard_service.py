@@ -0,0 +1,160 @@
+# 成绩单物化表
+#
+# 每个组别（比赛 + 项目 + 组别 + 性别）的完整成绩单按名次顺序预先写入 leaderboard_entries，
+# 读取一整张成绩单只需一条按索引读取的查询，不再排序或重新计算差距。
+# 导入时由 services.derived_tables 在同一事务中只重建被改动的组别。
+from collections import defaultdict
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, insert, select
+
+from models import (
+    Result, Athlete, Competition, Event, Category, Organization, LeaderboardEntry,
+    EventTypeEnum, CategoryNameEnum, GenderEnum, ResultStatusEnum,
+)
+from schemas import LeaderboardEntryResponse, LeaderboardResponse
+
+# 一次刷新的组别数（IN 列表长度）
+REFRESH_CHUNK_SIZE = 500
+
+# 完成的成绩在前，其后依次为 DNF、DSQ
+STATUS_ORDER = {
+    ResultStatusEnum.COMPLETED: 0,
+    ResultStatusEnum.DNF: 1,
+    ResultStatusEnum.DSQ: 2,
+}
+
+_SOURCE_COLUMNS = (
+    Result.id, Result.category_id, Result.athlete_id, Result.competition_id, Result.event_id,
+    Result.rank, Result.status, Result.run1_time, Result.run2_time, Result.total_time,
+    Result.time_behind_leader, Result.run1_time_cs, Result.run2_time_cs, Result.total_time_cs,
+)
+
+
+def _sort_key(row) -> tuple:
+    """名次为空的排在有名次的之后，再按总成绩、成绩ID排列"""
+    return (
+        STATUS_ORDER[row.status],
+        row.rank is None, row.rank or 0,
+        row.total_time_cs is None, row.total_time_cs or 0,
+        row.id,
+    )
+
+
+def _insert_entries(conn, rows):
+    by_category = defaultdict(list)
+    for row in rows:
+        by_category[row.category_id].append(row)
+
+    entries = []
+    for category_id, group in by_category.items():
+        group.sort(key=_sort_key)
+        winner_cs = min(
+            (row.total_time_cs for row in group
+             if row.status == ResultStatusEnum.COMPLETED and row.total_time_cs is not None),
+            default=None
+        )
+        for position, row in enumerate(group, 1):
+            behind_cs = None
+            if winner_cs is not None and row.total_time_cs is not None:
+                behind_cs = row.total_time_cs - winner_cs
+            entries.append({
+                "category_id": category_id,
+                "position": position,
+                "result_id": row.id,
+                "athlete_id": row.athlete_id,
+                "competition_id": row.competition_id,
+                "event_id": row.event_id,
+                "rank": row.rank,
+                "status": row.status,
+                "run1_time": row.run1_time,
+                "run2_time": row.run2_time,
+                "total_time": row.total_time,
+                "time_behind_leader": row.time_behind_leader,
+                "run1_time_cs": row.run1_time_cs,
+                "run2_time_cs": row.run2_time_cs,
+                "total_time_cs": row.total_time_cs,
+                "behind_cs": behind_cs,
+            })
+
+    if entries:
+        conn.execute(insert(LeaderboardEntry), entries)
+
+
+def refresh(conn, category_ids: Iterable[str]):
+    """重建指定组别的成绩单；conn 可以是 Session 或 Connection"""
+    category_ids = sorted(set(category_ids))
+    for start in range(0, len(category_ids), REFRESH_CHUNK_SIZE):
+        chunk = category_ids[start:start + REFRESH_CHUNK_SIZE]
+        conn.execute(delete(LeaderboardEntry).where(LeaderboardEntry.category_id.in_(chunk)))
+        _insert_entries(conn, conn.execute(select(*_SOURCE_COLUMNS).where(Result.category_id.in_(chunk))))
+
+
+def rebuild_all(conn):
+    """按成绩表当前内容重建全部成绩单"""
+    conn.execute(delete(LeaderboardEntry))
+    _insert_entries(conn, conn.execute(select(*_SOURCE_COLUMNS)))
+
+
+def get_leaderboard(db, competition_id: str, event_type: EventTypeEnum, category: CategoryNameEnum,
+                    gender: GenderEnum) -> Optional[LeaderboardResponse]:
+    """读取一张完整成绩单，组别不存在或没有成绩时返回 None
+
+    比赛 + 项目经 ix_events_name_competition、项目 + 组别经 ix_categories_name_event 定位组别，
+    成绩单按主键 (category_id, position) 顺序读取，运动员与组织按主键关联。
+    """
+    statement = (
+        select(
+            Competition.name.label("competition_name"),
+            Competition.date.label("competition_date"),
+            *LeaderboardEntry.__table__.c,
+            Athlete.name.label("athlete_name"),
+            Organization.name.label("organization_name"),
+        )
+        .select_from(Event)
+        .join(Competition, Competition.id == Event.competition_id)
+        .join(Category, Category.event_id == Event.id)
+        .join(LeaderboardEntry, LeaderboardEntry.category_id == Category.id)
+        .join(Athlete, Athlete.id == LeaderboardEntry.athlete_id)
+        .outerjoin(Organization, Organization.id == Athlete.organization_id)
+        .where(
+            Event.competition_id == competition_id,
+            Event.name == event_type,
+            Category.name == category,
+            Category.gender == gender,
+        )
+        .order_by(LeaderboardEntry.category_id, LeaderboardEntry.position)
+    )
+    rows = db.execute(statement).all()
+    if not rows:
+        return None
+
+    # 同一项目下重复录入的同名组别只返回第一个
+    first = rows[0]
+    return LeaderboardResponse(
+        competition_id=competition_id,
+        competition_name=first.competition_name,
+        competition_date=first.competition_date,
+        event_name=event_type.value,
+        category_id=first.category_id,
+        category_name=category.value,
+        gender=gender.value,
+        entries=[
+            LeaderboardEntryResponse(
+                position=row.position,
+                result_id=row.result_id,
+                athlete_id=row.athlete_id,
+                athlete_name=row.athlete_name,
+                organization_name=row.organization_name,
+                rank=row.rank,
+                status=row.status.value,
+                run1_time=row.run1_time,
+                run2_time=row.run2_time,
+                total_time=row.total_time,
+                time_behind_leader=row.time_behind_leader,
+                total_time_cs=row.total_time_cs,
+                behind_cs=row.behind_cs,
+            )
+            for row in rows if row.category_id == first.category_id
+        ]
+    )
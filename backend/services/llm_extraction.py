@@ -0,0 +1,136 @@
+# 成绩单分块提取
+#
+# 长成绩单（多组别成绩册、几十人的组别）一次送给模型时输出会被 max_tokens 截断，
+# 且只能串行等待一次很长的调用。这里按组别标题行（如 “U13 男子”“丁组 女子”）把文本切成段，
+# 标题行只由组别、性别和项目名称等说明词组成，带组别和性别的 DNF 等成绩行不算标题。
+# 再把相邻的段合并成不超过 LLM_CHUNK_MAX_CHARS 字符的块；单个组别超长时按行切开并重复标题行。
+# 第一个标题之前的内容（比赛名称、日期、地点）加在每个块前面作为上下文。
+# 各块的提取结果由 merge_results 合并：比赛和项目信息取第一个非空值，成绩按
+# (姓名, 组别, 性别) 去重，保留字段最完整的一条。
+import re
+import threading
+import time
+from typing import Dict, List
+
+from models import CategoryNameEnum, EventTypeEnum
+
+
+def _alternation(words) -> str:
+    # 长的在前，“超级大回转”不会只匹配到“大回转”
+    return "|".join(re.escape(word) for word in sorted(words, key=len, reverse=True))
+
+
+# 标题行中除组别和性别外允许出现的词：项目名称和“组”“成绩公告”一类的说明
+_HEADER_WORDS = [e.value for e in EventTypeEnum] + [
+    "男子", "女子", "男", "女", "组别", "组", "高山滑雪", "非正式", "正式", "最终",
+    "总成绩", "成绩公告", "成绩单", "成绩", "公告", "名单", "决赛",
+]
+_CATEGORY_RE = re.compile(_alternation(c.value for c in CategoryNameEnum))
+_HEADER_RE = re.compile(
+    rf"(?:{_alternation([c.value for c in CategoryNameEnum] + _HEADER_WORDS)}|[\s_\-—:：·|()（）\[\]【】、，,])+"
+)
+
+
+def is_category_header(line: str) -> bool:
+    """组别标题行：只由组别名称、性别和项目名称等说明词组成。
+    成绩行即使含组别和性别，也带有名次、姓名、单位、时间或 DNF/未完成 等状态，不会被当作标题"""
+    stripped = line.strip()
+    return (
+        bool(_HEADER_RE.fullmatch(stripped))
+        and _CATEGORY_RE.search(stripped) is not None
+        and re.search("[男女]", stripped) is not None
+    )
+
+
+def _split_long(header: str, lines: List[str], max_chars: int) -> List[str]:
+    pieces, current, size = [], [], len(header)
+    for line in lines:
+        if current and size + len(line) + 1 > max_chars:
+            pieces.append("\n".join(([header] if header else []) + current))
+            current, size = [], len(header)
+        current.append(line)
+        size += len(line) + 1
+    if current:
+        pieces.append("\n".join(([header] if header else []) + current))
+    return pieces
+
+
+def split_chunks(text: str, max_chars: int) -> List[str]:
+    """按组别标题切分文本，每块不超过 max_chars 字符（不含公共的开头部分）"""
+    lines = [line for line in text.splitlines() if line.strip()]
+    preamble, sections = [], []
+    for line in lines:
+        if is_category_header(line):
+            sections.append((line, []))
+        elif sections:
+            sections[-1][1].append(line)
+        else:
+            preamble.append(line)
+    if not sections:
+        preamble, sections = [], [("", lines)]
+
+    pieces = []
+    for header, body in sections:
+        pieces.extend(_split_long(header, body, max_chars) if body else [header])
+
+    chunks, current = [], ""
+    for piece in pieces:
+        if current and len(current) + len(piece) + 1 > max_chars:
+            chunks.append(current)
+            current = ""
+        current = f"{current}\n{piece}" if current else piece
+
+    if current:
+        chunks.append(current)
+
+    context = "\n".join(preamble)
+    return [f"{context}\n{chunk}" if context else chunk for chunk in chunks] or [text]
+
+
+def _filled(result: Dict) -> int:
+    return sum(1 for value in result.values() if value not in (None, ""))
+
+
+def merge_results(payloads: List[Dict]) -> Dict:
+    """合并各块的提取结果"""
+    merged = {"competition": {}, "event": {}, "results": [], "confidence": None}
+    index = {}
+    for payload in payloads:
+        for section in ("competition", "event"):
+            for key, value in (payload.get(section) or {}).items():
+                if value not in (None, "") and merged[section].get(key) in (None, ""):
+                    merged[section][key] = value
+
+        for result in payload.get("results") or []:
+            key = (result.get("athlete_name"), result.get("category"), result.get("gender"))
+            if key[0] is None:
+                merged["results"].append(result)
+            elif key not in index:
+                index[key] = len(merged["results"])
+                merged["results"].append(result)
+            elif _filled(result) > _filled(merged["results"][index[key]]):
+                merged["results"][index[key]] = result
+
+        confidence = payload.get("confidence")
+        if isinstance(confidence, (int, float)):
+            merged["confidence"] = confidence if merged["confidence"] is None else min(merged["confidence"], confidence)
+    return merged
+
+
+class RateLimiter:
+    """限制每分钟发起的请求数：相邻两次请求至少间隔 60 / per_minute 秒（per_minute 为 0 时不限制）"""
+
+    def __init__(self, per_minute: float):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
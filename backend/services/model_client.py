@@ -0,0 +1,66 @@
+# 大模型调用客户端
+#
+# 识别服务只依赖 complete(prompt, max_tokens) -> 文本 和 model_id 两个接口，
+# LLM_CLIENT=bedrock（默认）时调用 AWS Bedrock，LLM_CLIENT=stub 时使用本地桩客户端，
+# 供测试和压测在没有网络和凭证的环境下运行整条导入流程。
+import json
+import os
+import time
+from typing import Callable, Dict, Optional
+
+DEFAULT_MODEL_ID = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+
+
+class BedrockModelClient:
+    def __init__(self, model_id: str = DEFAULT_MODEL_ID, region: Optional[str] = None):
+        import boto3
+
+        self.model_id = model_id
+        self.client = boto3.client(
+            service_name='bedrock-runtime',
+            region_name=region or os.getenv("AWS_REGION", "us-west-2")
+        )
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        request_body = {
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": max_tokens,
+            "temperature": 0.1,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ]
+        }
+        response = self.client.invoke_model(
+            modelId=self.model_id,
+            body=json.dumps(request_body)
+        )
+        response_body = json.loads(response['body'].read())
+        return response_body['content'][0]['text']
+
+
+class StubModelClient:
+    """本地桩客户端：handler 接收提示词并返回结构化数据（默认返回空结果），delay 模拟模型延迟（秒）"""
+
+    def __init__(self, handler: Optional[Callable[[str], Dict]] = None, delay: float = 0.0, model_id: str = "stub"):
+        self.handler = handler
+        self.delay = delay
+        self.model_id = model_id
+        self.calls = 0
+
+    def complete(self, prompt: str, max_tokens: int) -> str:
+        self.calls += 1
+        if self.delay:
+            time.sleep(self.delay)
+        if self.handler is None:
+            return json.dumps({"competition": {}, "event": {}, "results": [], "confidence": 0.0})
+        return json.dumps(self.handler(prompt), ensure_ascii=False)
+
+
+def create_model_client():
+    """按 LLM_CLIENT 配置创建客户端"""
+    if os.getenv("LLM_CLIENT", "bedrock") == "stub":
+        return StubModelClient(delay=float(os.getenv("LLM_STUB_DELAY_SECONDS", "0")))
+    return BedrockModelClient(os.getenv("LLM_MODEL_ID", DEFAULT_MODEL_ID))
@@ -0,0 +1,78 @@
+# 名称 n-gram 全文索引
+#
+# 运动员和组织名称以"逐字加空格"的形式写入 SQLite FTS5 表（unicode61 分词器下
+# 每个汉字即一个词元），子串查询转换为相邻词元的短语查询，任意长度的子串都能走索引。
+# 索引行在不参与分词的 id 列中保存源表主键，查询按 id 关联（源表 rowid 可能被 VACUUM 重新编号，不能使用），
+# 由迁移版本 10 创建的触发器随写入自动同步。
+from sqlalchemy import literal_column, select, table, column, text
+from sqlalchemy.sql import ColumnElement
+
+# 只索引名称的前 MAX_INDEXED_CHARS 个字符
+MAX_INDEXED_CHARS = 64
+
+# 源表 -> FTS 表
+NAME_INDEXES = {
+    "athletes": "athlete_name_fts",
+    "organizations": "organization_name_fts",
+}
+
+
+def spaced_chars_sql(expr: str) -> str:
+    """生成把 expr 拆成空格分隔单字的 SQL 表达式（触发器中不能使用递归 CTE）"""
+    return " || ' ' || ".join(f"substr({expr}, {i}, 1)" for i in range(1, MAX_INDEXED_CHARS + 1))
+
+
+def create_statements(source: str) -> list:
+    """创建 FTS 表和同步触发器的 SQL
+
+    按 id 删除索引行需要扫描 FTS 表，只在删除源表行或修改名称时发生。
+    """
+    fts = NAME_INDEXES[source]
+    return [
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(chars, id UNINDEXED, tokenize='unicode61')",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {fts} (chars, id) VALUES ({spaced_chars_sql('new.name')}, new.id); END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {source} BEGIN "
+        f"DELETE FROM {fts} WHERE id = old.id; END",
+        f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF id, name ON {source} BEGIN "
+        f"DELETE FROM {fts} WHERE id = old.id; "
+        f"INSERT INTO {fts} (chars, id) VALUES ({spaced_chars_sql('new.name')}, new.id); END",
+    ]
+
+
+def drop_statements(source: str) -> list:
+    """删除 FTS 表和同步触发器的 SQL"""
+    fts = NAME_INDEXES[source]
+    return [f"DROP TRIGGER IF EXISTS {fts}_{suffix}" for suffix in ("ai", "ad", "au")] + [
+        f"DROP TABLE IF EXISTS {fts}"
+    ]
+
+
+def rebuild(conn):
+    """按源表当前内容重建所有名称索引"""
+    for source, fts in NAME_INDEXES.items():
+        conn.execute(text(f"DELETE FROM {fts}"))
+        conn.execute(text(
+            f"INSERT INTO {fts} (chars, id) SELECT {spaced_chars_sql('name')}, id FROM {source}"
+        ))
+
+
+def to_phrase(term: str) -> str:
+    """把查询子串转换为 FTS5 短语查询"""
+    chars = [ch for ch in term if not ch.isspace()]
+    return '"' + " ".join(chars).replace('"', '""') + '"'
+
+
+def is_indexable(term: str) -> bool:
+    """至少包含一个字母或数字（含汉字）时才能走全文索引"""
+    return any(ch.isalnum() for ch in term) and len(term) <= MAX_INDEXED_CHARS
+
+
+def name_contains(source: str, name_column, term: str, dialect_name: str) -> ColumnElement:
+    """名称包含 term 的过滤条件：SQLite 走 n-gram 索引，其它情况退回 LIKE"""
+    if dialect_name != "sqlite" or not is_indexable(term):
+        return name_column.like(f"%{term}%")
+
+    fts = table(NAME_INDEXES[source], column("id"))
+    matched = select(fts.c.id).where(literal_column(NAME_INDEXES[source]).op("MATCH")(to_phrase(term)))
+    return literal_column(f"{source}.id").in_(matched)
@@ -0,0 +1,125 @@
+# 组织奖牌榜与团体积分
+#
+# organization_competition_places 保存每个组织在每场比赛中获得第 1~8 名的次数及参赛、完赛人次，
+# 导入时由 services.derived_tables 在同一事务中只重算被改动的比赛。
+# 奖牌榜和团体积分在读取时按比赛或赛季汇总这张小表，积分表可在请求中指定，改积分规则不需要重算。
+import os
+from typing import Iterable, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+
+from models import Result, Athlete, Competition, Organization, OrganizationPlaces, ResultStatusEnum
+from schemas import OrganizationStanding, OrganizationTableResponse
+
+PLACES = 8
+
+# 默认积分表：第 1~8 名的得分
+DEFAULT_POINTS = [int(p) for p in os.getenv("ORG_POINTS_TABLE", "9,7,6,5,4,3,2,1").split(",")]
+
+# 一次重算的比赛数（IN 列表长度）
+REFRESH_CHUNK_SIZE = 200
+
+_PLACE_COLUMNS = [getattr(OrganizationPlaces, f"place_{place}") for place in range(1, PLACES + 1)]
+
+
+def parse_points(value: Optional[str]) -> List[int]:
+    """解析 '9,7,6,5,4,3,2,1' 形式的积分表，最多 8 项，不足的名次记 0 分"""
+    if not value:
+        return DEFAULT_POINTS
+    points = [int(p) for p in value.split(",")]
+    if not 1 <= len(points) <= PLACES or any(p < 0 for p in points):
+        raise ValueError("无效的积分表")
+    return points
+
+
+def _insert_places(conn, rows):
+    places = {}
+    for row in rows:
+        key = (row.organization_id, row.competition_id)
+        entry = places.setdefault(key, {
+            "organization_id": key[0], "competition_id": key[1], "starts": 0, "finishes": 0,
+            **{f"place_{place}": 0 for place in range(1, PLACES + 1)},
+        })
+        entry["starts"] += 1
+        if row.status != ResultStatusEnum.COMPLETED:
+            continue
+        entry["finishes"] += 1
+        if row.rank is not None and 1 <= row.rank <= PLACES:
+            entry[f"place_{row.rank}"] += 1
+    if places:
+        conn.execute(insert(OrganizationPlaces), list(places.values()))
+
+
+def _source_query():
+    return (
+        select(Athlete.organization_id, Result.competition_id, Result.status, Result.rank)
+        .join(Athlete, Athlete.id == Result.athlete_id)
+        .where(Athlete.organization_id.is_not(None))
+    )
+
+
+def refresh(conn, competition_ids: Iterable[str]):
+    """重算指定比赛的名次统计；conn 可以是 Session 或 Connection"""
+    competition_ids = sorted(set(competition_ids))
+    for start in range(0, len(competition_ids), REFRESH_CHUNK_SIZE):
+        chunk = competition_ids[start:start + REFRESH_CHUNK_SIZE]
+        conn.execute(delete(OrganizationPlaces).where(OrganizationPlaces.competition_id.in_(chunk)))
+        _insert_places(conn, conn.execute(_source_query().where(Result.competition_id.in_(chunk))))
+
+
+def rebuild_all(conn):
+    """按成绩表当前内容重算全部名次统计"""
+    conn.execute(delete(OrganizationPlaces))
+    _insert_places(conn, conn.execute(_source_query()))
+
+
+def organization_table(db, competition_id: Optional[str] = None, season: Optional[str] = None,
+                       points: Optional[List[int]] = None, sort: str = "medals") -> OrganizationTableResponse:
+    """按比赛、赛季或全部比赛汇总各组织的奖牌数、前八名次数和团体积分
+
+    sort 为 medals 时按金、银、铜牌数排列，为 points 时按积分排列。
+    """
+    points = points or DEFAULT_POINTS
+    statement = (
+        select(
+            Organization.id, Organization.name,
+            func.sum(OrganizationPlaces.starts).label("starts"),
+            func.sum(OrganizationPlaces.finishes).label("finishes"),
+            *[func.sum(column).label(column.key) for column in _PLACE_COLUMNS]
+        )
+        .join(Organization, Organization.id == OrganizationPlaces.organization_id)
+        .group_by(Organization.id, Organization.name)
+    )
+    if competition_id:
+        statement = statement.where(OrganizationPlaces.competition_id == competition_id)
+    if season:
+        statement = (statement.join(Competition, Competition.id == OrganizationPlaces.competition_id)
+                     .where(Competition.season == season))
+
+    standings = []
+    for row in db.execute(statement):
+        places = [getattr(row, column.key) or 0 for column in _PLACE_COLUMNS]
+        standings.append(OrganizationStanding(
+            organization_id=row.id,
+            organization_name=row.name,
+            gold=places[0],
+            silver=places[1],
+            bronze=places[2],
+            top8=sum(places),
+            places=places,
+            starts=row.starts or 0,
+            finishes=row.finishes or 0,
+            points=sum(count * score for count, score in zip(places, points))
+        ))
+
+    if sort == "points":
+        standings.sort(key=lambda s: (-s.points, -s.gold, -s.silver, -s.bronze, s.organization_name))
+    else:
+        standings.sort(key=lambda s: (-s.gold, -s.silver, -s.bronze, -s.points, s.organization_name))
+
+    return OrganizationTableResponse(
+        competition_id=competition_id,
+        season=season,
+        points_table=points,
+        standings=standings
+    )
@@ -0,0 +1,139 @@
+# PDF 文本并行提取
+#
+# pdfplumber 解析是纯 CPU 计算，单个进程只能用满一个核。这里把每个文件按
+# PDF_PAGE_BATCH 页一批分给进程池，多个文件的所有批次同时排队；结果按文件、
+# 页码顺序逐页产出，前面的批次完成即可交给后续阶段，不必等整个文件提取完。
+# PDF_EXTRACT_WORKERS 为 1 或只有一批时在当前进程中直接提取。
+# 提取结果按文件内容的 SHA-256 缓存在磁盘上（page_cache），同一文件再次导入时不再解析；
+# 同一次调用中重复的路径或内容相同的文件也只解析一次。
+# 工作进程执行的函数在 services.pdf_worker 中，工作进程只导入该模块和 pdfplumber（见 _submit）。
+import atexit
+import hashlib
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from services import pdf_worker
+from services.cache import DiskCache
+from services.pdf_worker import extract_pages, page_count
+
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PAGE_BATCH = int(os.getenv("PDF_PAGE_BATCH", "4"))
+
+# 文件内容哈希 -> 各页文本
+page_cache = DiskCache(
+    Path(os.getenv("EXTRACTION_CACHE_DIR", "./cache/extraction")) / "pages",
+    max_bytes=int(os.getenv("TEXT_CACHE_MAX_BYTES", str(128 * 1024 * 1024)))
+)
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # 调用方可能在多线程的 Web 服务中，使用 spawn 避免 fork 时复制锁状态
+            _executor = ProcessPoolExecutor(
+                max_workers=PDF_EXTRACT_WORKERS,
+                mp_context=multiprocessing.get_context("spawn")
+            )
+            atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+        return _executor
+
+
+def _submit(batches: List[Tuple[str, int, int]]) -> Dict[Tuple[str, int], Future]:
+    """把各批次提交到进程池，返回 {(文件路径, 起始页): Future}
+
+    spawn 启动的工作进程会先导入父进程的 __main__（直接运行 main.py 时就是整个应用）。
+    进程池在 submit 时按需启动工作进程，提交期间把 __main__ 临时换成 services.pdf_worker，
+    工作进程的主模块因此只依赖 pdfplumber。
+    """
+    executor = _get_executor()
+    with _executor_lock:
+        main_module = sys.modules["__main__"]
+        sys.modules["__main__"] = pdf_worker
+        try:
+            return {(path, start): executor.submit(extract_pages, path, start, end) for path, start, end in batches}
+        finally:
+            sys.modules["__main__"] = main_module
+
+
+def file_hash(file_path: str) -> str:
+    """文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def iter_pdf_pages(file_paths: Iterable[str], parallel: bool = PDF_EXTRACT_WORKERS > 1) -> Iterator[Tuple[str, int, int, str]]:
+    """按文件、页码顺序逐页产出 (文件路径, 页码, 总页数, 页面文本)；重复的路径只产出一次"""
+    files = []
+    # 文件内容哈希 -> 各页文本（已缓存或本次已提取）
+    extracted: Dict[str, List[str]] = {}
+    # 需要解析的文件内容哈希 -> 解析用的路径（内容相同的文件只解析第一个）
+    pending: Dict[str, str] = {}
+    for path in dict.fromkeys(file_paths):
+        key = file_hash(path)
+        if key not in extracted and key not in pending:
+            pages = page_cache.get(key)
+            if pages is not None:
+                extracted[key] = pages
+            else:
+                pending[key] = path
+        count = len(extracted[key]) if key in extracted else None
+        files.append((path, key, count if count is not None else page_count(pending[key])))
+
+    batches = [
+        (path, start, min(start + PDF_PAGE_BATCH, count))
+        for path, key, count in files if pending.get(key) == path
+        for start in range(0, count, PDF_PAGE_BATCH)
+    ]
+    futures = {}
+    if parallel and len(batches) > 1:
+        futures = _submit(batches)
+
+    try:
+        for path, key, count in files:
+            if key in extracted:
+                for page, text in enumerate(extracted[key]):
+                    yield path, page, count, text
+                continue
+            pages = []
+            for start in range(0, count, PDF_PAGE_BATCH):
+                future = futures.get((path, start))
+                batch = future.result() if future else extract_pages(path, start, min(start + PDF_PAGE_BATCH, count))
+                for offset, text in enumerate(batch):
+                    pages.append(text)
+                    yield path, start + offset, count, text
+            page_cache.set(key, pages)
+            extracted[key] = pages
+    finally:
+        for future in futures.values():
+            future.cancel()
+
+
+def join_pages(pages: Iterable[str]) -> str:
+    """拼接页面文本，每个非空页面后加换行（与逐页提取的结果一致）"""
+    return "".join(text + "\n" for text in pages if text)
+
+
+def extract_pdf_text(file_path: str, parallel: bool = PDF_EXTRACT_WORKERS > 1) -> str:
+    """提取单个 PDF 的全部文本"""
+    return join_pages(text for _, _, _, text in iter_pdf_pages([file_path], parallel))
+
+
+def extract_pdf_texts(file_paths: Iterable[str], parallel: bool = PDF_EXTRACT_WORKERS > 1) -> Dict[str, str]:
+    """并行提取多个 PDF，返回 {文件路径: 文本}"""
+    file_paths = list(dict.fromkeys(file_paths))
+    pages: Dict[str, List[str]] = {path: [] for path in file_paths}
+    for path, _, _, text in iter_pdf_pages(file_paths, parallel):
+        pages[path].append(text)
+    return {path: join_pages(texts) for path, texts in pages.items()}
@@ -0,0 +1,19 @@
+# PDF 解析工作进程
+#
+# 进程池中执行的函数单独放在这个只依赖 pdfplumber 的模块里：spawn 启动的工作进程
+# 反序列化任务时只导入本模块，不会连带导入缓存、数据库等应用模块。
+from typing import List
+
+import pdfplumber
+
+
+def extract_pages(file_path: str, start: int, end: int) -> List[str]:
+    """提取 [start, end) 页的文本"""
+    with pdfplumber.open(file_path) as pdf:
+        return [pdf.pages[i].extract_text() or "" for i in range(start, end)]
+
+
+def page_count(file_path: str) -> int:
+    """PDF 的总页数"""
+    with pdfplumber.open(file_path) as pdf:
+        return len(pdf.pages)
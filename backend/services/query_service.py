@@ -1,22 +1,187 @@
 # 查询服务
 from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
+from sqlalchemy import String, and_, or_, func, literal, select, type_coerce, union_all
 from models import Result, Athlete, Competition, Event, Category, Organization
-from schemas import QueryParams, ResultResponse
-from typing import List, Tuple
+from models import EventTypeEnum, CategoryNameEnum, ResultStatusEnum
+from schemas import QueryParams, QueryResponse, ResultResponse, FacetCount, FacetsResponse
+from services.cache import LRUCache
+from services.data_version import get_generation
+from services.name_index import name_contains
+from services.read_model import read_model
+from services.time_parser import parse_time_cs
+from typing import List, Optional, Tuple
+from datetime import date
+import base64
+import json
+import math
+import os
+
+# 估算总数时最多数到的行数，达到该值时 total 为下限
+ESTIMATE_COUNT_CAP = int(os.getenv("ESTIMATE_COUNT_CAP", "1000"))
+
+# 过滤条件 -> (数据版本号, 总数)
+count_cache = LRUCache(maxsize=int(os.getenv("COUNT_CACHE_SIZE", "4096")))
+
+# 估算缓存占用时每条成绩、每个分面取值和每个响应本身的字节数（与序列化后的 JSON 长度相当）
+RESULT_ROW_BYTES = 400
+FACET_ITEM_BYTES = 50
+RESPONSE_BYTES = 200
+
+
+def _response_size(response) -> int:
+    """按行数估算响应的大小，不为估算而序列化整个响应"""
+    if isinstance(response, FacetsResponse):
+        items = sum(len(getattr(response, name)) for name in FACETS)
+        return RESPONSE_BYTES + FACET_ITEM_BYTES * items
+    return RESPONSE_BYTES + RESULT_ROW_BYTES * len(response.results)
+
+
+# (数据版本号, 查询参数) -> QueryResponse / FacetsResponse
+result_cache = LRUCache(
+    maxsize=int(os.getenv("RESULT_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("RESULT_CACHE_TTL_SECONDS", "300")),
+    max_bytes=int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    sizeof=_response_size
+)
+
+
+def encode_cursor(sort: str, value, result_id: str) -> str:
+    """将 (排序方式, 排序键, 成绩ID) 编码为不透明的分页游标"""
+    if isinstance(value, date):
+        value = value.isoformat()
+    raw = json.dumps([sort, value, result_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[object, str]:
+    """解析分页游标，返回 (排序键, 成绩ID)；格式不正确或与排序方式不符时抛出 ValueError"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, value, result_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        if cursor_sort != sort:
+            raise ValueError
+        if sort == "date":
+            value = date.fromisoformat(value)
+        elif value is not None:
+            value = int(value)
+        return value, str(result_id)
+    except Exception:
+        raise ValueError("无效的分页游标")
+
+
+def filter_key(params: QueryParams) -> tuple:
+    """规范化的过滤条件（不含分页参数），用作总数缓存的键"""
+    def normalize(value):
+        if isinstance(value, str):
+            return value.strip() or None
+        return value
+
+    return (
+        normalize(params.athlete_name),
+        normalize(params.event_type),
+        normalize(params.category),
+        normalize(params.organization),
+        params.date_from,
+        params.date_to,
+        normalize(params.season),
+        parse_time_cs(params.max_total_time),
+    )
+
+
+def params_key(params: QueryParams) -> tuple:
+    """规范化的完整查询参数，用作结果缓存的键"""
+    return filter_key(params) + (params.sort, params.page, params.page_size, params.cursor, params.count)
+
+
+# 分面：名称 -> (分组列, 对应的过滤参数, 数据库中存储枚举名称的枚举类)
+FACETS = {
+    "event_type": (Event.name, "event_type", EventTypeEnum),
+    "category": (Category.name, "category", CategoryNameEnum),
+    "organization": (Organization.name, "organization", None),
+    "season": (Competition.season, "season", None),
+    "status": (Result.status, None, ResultStatusEnum),
+}
+
+
+def _sort_rows(rows: list, sort: str) -> list:
+    """按与 build_ordered_query 一致的顺序在内存中排列结果行"""
+    if sort == "total_time":
+        return sorted(rows, key=lambda row: (row.total_time_cs is None, row.total_time_cs or 0, row.id))
+    return sorted(rows, key=lambda row: (row.competition_date, row.id), reverse=True)
+
+
+def cache_stats() -> dict:
+    """查询缓存的统计信息"""
+    return {"results": result_cache.stats(), "counts": count_cache.stats()}
+
+
+# search_results 返回的列，恰好覆盖 ResultResponse 所需字段
+RESULT_COLUMNS = (
+    Result.id.label("id"),
+    Athlete.name.label("athlete_name"),
+    Organization.name.label("organization_name"),
+    Competition.name.label("competition_name"),
+    Competition.date.label("competition_date"),
+    Event.name.label("event_name"),
+    Category.name.label("category_name"),
+    Category.gender.label("gender"),
+    Result.run1_time.label("run1_time"),
+    Result.run2_time.label("run2_time"),
+    Result.total_time.label("total_time"),
+    Result.rank.label("rank"),
+    Result.time_behind_leader.label("time_behind_leader"),
+    Result.total_time_cs.label("total_time_cs"),
+    Result.status.label("status"),
+)
+
+
+def row_to_response(row) -> ResultResponse:
+    """将列投影查询的结果行转换为 ResultResponse"""
+    return ResultResponse(
+        id=row.id,
+        athlete_name=row.athlete_name,
+        organization_name=row.organization_name,
+        competition_name=row.competition_name,
+        competition_date=row.competition_date,
+        event_name=row.event_name.value,
+        category_name=row.category_name.value,
+        gender=row.gender.value,
+        run1_time=row.run1_time,
+        run2_time=row.run2_time,
+        total_time=row.total_time,
+        rank=row.rank,
+        time_behind_leader=row.time_behind_leader,
+        total_time_cs=row.total_time_cs,
+        status=row.status.value
+    )
+
 
 class QueryService:
     def __init__(self, db: Session):
         self.db = db
     
-    def search_results(self, params: QueryParams) -> Tuple[List[ResultResponse], int]:
-        """根据查询参数搜索成绩"""
-        query = self.db.query(Result).join(Athlete).join(Competition).join(Event).join(Category)
+    def _filtered_query(self, params: QueryParams, *columns, with_organization: bool = False):
+        """构建带连接和过滤条件的查询"""
+        query = (
+            self.db.query(*columns)
+            .select_from(Result)
+            .join(Athlete, Result.athlete_id == Athlete.id)
+            .join(Competition, Result.competition_id == Competition.id)
+            .join(Event, Result.event_id == Event.id)
+            .join(Category, Result.category_id == Category.id)
+        )
+        
+        # 按组织过滤时无组织的成绩必然被排除，用内连接让查询计划可以从组织索引出发
+        if params.organization:
+            query = query.join(Organization, Athlete.organization_id == Organization.id)
+        elif with_organization:
+            query = query.join(Organization, Athlete.organization_id == Organization.id, isouter=True)
         
         filters = []
+        dialect_name = self.db.get_bind().dialect.name
         
         if params.athlete_name:
-            filters.append(Athlete.name.like(f"%{params.athlete_name}%"))
+            filters.append(name_contains("athletes", Athlete.name, params.athlete_name, dialect_name))
         
         if params.event_type:
             filters.append(Event.name == params.event_type)
@@ -25,8 +190,7 @@ class QueryService:
             filters.append(Category.name == params.category)
         
         if params.organization:
-            query = query.join(Organization, Athlete.organization_id == Organization.id, isouter=True)
-            filters.append(Organization.name.like(f"%{params.organization}%"))
+            filters.append(name_contains("organizations", Organization.name, params.organization, dialect_name))
         
         if params.date_from:
             filters.append(Competition.date >= params.date_from)
@@ -37,32 +201,242 @@ class QueryService:
         if params.season:
             filters.append(Competition.season == params.season)
         
+        if params.max_total_time:
+            max_total_time_cs = parse_time_cs(params.max_total_time)
+            if max_total_time_cs is None:
+                raise ValueError("无效的时间格式")
+            filters.append(Result.total_time_cs <= max_total_time_cs)
+        
         if filters:
             query = query.filter(and_(*filters))
         
-        query = query.order_by(Competition.date.desc())
-        total = query.count()
-        
-        offset = (params.page - 1) * params.page_size
-        results = query.offset(offset).limit(params.page_size).all()
-        
-        result_responses = []
-        for result in results:
-            result_responses.append(ResultResponse(
-                id=result.id,
-                athlete_name=result.athlete.name,
-                organization_name=result.athlete.organization.name if result.athlete.organization else None,
-                competition_name=result.competition.name,
-                competition_date=result.competition.date,
-                event_name=result.event.name.value,
-                category_name=result.category.name.value,
-                gender=result.category.gender.value,
-                run1_time=result.run1_time,
-                run2_time=result.run2_time,
-                total_time=result.total_time,
-                rank=result.rank,
-                time_behind_leader=result.time_behind_leader,
-                status=result.status.value
-            ))
-        
-        return result_responses, total
+        return query
+    
+    def build_ordered_query(self, params: QueryParams):
+        """构建不分页的成绩查询
+
+        sort=date 按比赛日期、成绩ID倒序；sort=total_time 按总成绩升序（无成绩的排在最后）、成绩ID升序。
+        """
+        query = self._filtered_query(params, *RESULT_COLUMNS, with_organization=True)
+        if params.sort == "total_time":
+            return query.order_by(Result.total_time_cs.asc().nulls_last(), Result.id.asc())
+        return query.order_by(Competition.date.desc(), Result.id.desc())
+    
+    def build_page_query(self, params: QueryParams):
+        """构建单页成绩查询（游标或偏移分页，多取一条）"""
+        query = self.build_ordered_query(params)
+        
+        if params.cursor:
+            value, cursor_id = decode_cursor(params.cursor, params.sort)
+            if params.sort == "total_time":
+                if value is None:
+                    condition = and_(Result.total_time_cs.is_(None), Result.id > cursor_id)
+                else:
+                    condition = or_(
+                        Result.total_time_cs > value,
+                        and_(Result.total_time_cs == value, Result.id > cursor_id),
+                        Result.total_time_cs.is_(None)
+                    )
+            else:
+                condition = or_(
+                    Competition.date < value,
+                    and_(Competition.date == value, Result.id < cursor_id)
+                )
+            query = query.filter(condition)
+        else:
+            query = query.offset((params.page - 1) * params.page_size)
+        
+        # 多取一条用于判断是否还有下一页
+        return query.limit(params.page_size + 1)
+    
+    def build_count_query(self, params: QueryParams):
+        """构建总数查询"""
+        return self._filtered_query(params, func.count(Result.id))
+    
+    def count_results(self, params: QueryParams, generation: int) -> Tuple[Optional[int], bool]:
+        """按 params.count 计算总数，返回 (总数, 是否为估算值)
+
+        exact: 精确计数，同一数据版本内按过滤条件缓存；
+        estimate: 优先使用缓存（可以是旧版本的），否则最多数到 ESTIMATE_COUNT_CAP 行；
+        none: 不计数。
+        """
+        if params.count == "none":
+            return None, False
+
+        key = filter_key(params)
+        cached = count_cache.get(key)
+        if cached is not None and cached[0] == generation:
+            return cached[1], False
+
+        if params.count == "estimate":
+            if cached is not None:
+                return cached[1], True
+            capped = self._filtered_query(params, Result.id).limit(ESTIMATE_COUNT_CAP).subquery()
+            total = self.db.query(func.count()).select_from(capped).scalar()
+            if total < ESTIMATE_COUNT_CAP:
+                count_cache.set(key, (generation, total))
+                return total, False
+            return total, True
+
+        total = self.build_count_query(params).scalar()
+        count_cache.set(key, (generation, total))
+        return total, False
+    
+    def _use_generation(self, generation: Optional[int]) -> int:
+        """读取（或沿用传入的）数据版本号；版本号变大时清空结果缓存"""
+        if generation is None:
+            generation = get_generation(self.db)
+        result_cache.advance_generation(generation)
+        return generation
+    
+    def search_results(self, params: QueryParams, generation: Optional[int] = None) -> QueryResponse:
+        """根据查询参数搜索成绩
+
+        按 sort 指定的排序键加成绩ID排序，保证分页顺序稳定。
+        传入 cursor 时使用游标分页，否则按 page 偏移分页；
+        两种模式都会在还有后续数据时返回 next_cursor。
+        查询结果为列投影，不加载 ORM 对象，每页的 SQL 条数与 page_size 无关。
+        结果按 (数据版本号, 查询参数) 缓存，导入数据后版本号变化，旧结果不会再被返回。
+        开启内存读模型且其快照与当前数据版本一致时，直接在内存中查询。
+        """
+        generation = self._use_generation(generation)
+        
+        key = (generation, params_key(params))
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        snapshot = read_model.current(generation)
+        if snapshot is not None and snapshot.supports(params):
+            response = snapshot.search(params)
+            result_cache.set(key, response)
+            return response
+        
+        total, total_is_estimate = self.count_results(params, generation)
+        rows = self.build_page_query(params).all()
+        response = self._build_response(params, rows, total, total_is_estimate)
+        result_cache.set(key, response)
+        return response
+    
+    def search_batch(self, params_list: List[QueryParams], generation: Optional[int] = None) -> List[QueryResponse]:
+        """在同一会话中执行多个查询
+
+        命中缓存的查询直接返回，内存读模型可用时在内存中查询；其余查询的分页查询合并为一条
+        UNION ALL 语句，需要精确计数的总数查询合并为另一条，N 个查询最多执行两条搜索 SQL。
+        """
+        generation = self._use_generation(generation)
+        snapshot = read_model.current(generation)
+        
+        responses: List[Optional[QueryResponse]] = [None] * len(params_list)
+        pending = []
+        for index, params in enumerate(params_list):
+            cached = result_cache.get((generation, params_key(params)))
+            if cached is not None:
+                responses[index] = cached
+            elif snapshot is not None and snapshot.supports(params):
+                responses[index] = snapshot.search(params)
+                result_cache.set((generation, params_key(params)), responses[index])
+            else:
+                pending.append(index)
+        if not pending:
+            return responses
+        
+        # 精确计数且缓存失效的查询合并计数，其余按 count 模式单独处理
+        totals = {}
+        merged_counts = []
+        for index in pending:
+            params = params_list[index]
+            cached = count_cache.get(filter_key(params))
+            if params.count == "exact" and not (cached is not None and cached[0] == generation):
+                merged_counts.append(index)
+            else:
+                totals[index] = self.count_results(params, generation)
+        if merged_counts:
+            count_statement = union_all(*[
+                select(
+                    literal(index).label("batch_index"),
+                    self.build_count_query(params_list[index]).statement.scalar_subquery().label("total")
+                )
+                for index in merged_counts
+            ])
+            for batch_index, total in self.db.execute(count_statement):
+                count_cache.set(filter_key(params_list[batch_index]), (generation, total))
+                totals[batch_index] = (total, False)
+        
+        page_selects = []
+        for index in pending:
+            page = self.build_page_query(params_list[index]).subquery()
+            page_selects.append(select(literal(index).label("batch_index"), *page.c))
+        rows_by_index = {index: [] for index in pending}
+        for row in self.db.execute(union_all(*page_selects)):
+            rows_by_index[row.batch_index].append(row)
+        
+        for index in pending:
+            params = params_list[index]
+            # UNION ALL 不保证各子查询内部的顺序，按排序键重新排列
+            rows = _sort_rows(rows_by_index[index], params.sort)
+            total, total_is_estimate = totals[index]
+            response = self._build_response(params, rows, total, total_is_estimate)
+            result_cache.set((generation, params_key(params)), response)
+            responses[index] = response
+        
+        return responses
+    
+    def _build_response(self, params: QueryParams, rows: list, total: Optional[int],
+                        total_is_estimate: bool) -> QueryResponse:
+        """由多取一条的分页结果构建 QueryResponse"""
+        next_cursor = None
+        if len(rows) > params.page_size:
+            rows = rows[:params.page_size]
+            last = rows[-1]
+            sort_value = last.total_time_cs if params.sort == "total_time" else last.competition_date
+            next_cursor = encode_cursor(params.sort, sort_value, last.id)
+        
+        total_pages = None
+        if total is not None:
+            total_pages = math.ceil(total / params.page_size) if total > 0 else 0
+        
+        return QueryResponse(
+            results=[row_to_response(row) for row in rows],
+            total=total,
+            page=params.page,
+            page_size=params.page_size,
+            total_pages=total_pages,
+            total_is_estimate=total_is_estimate,
+            next_cursor=next_cursor
+        )
+    
+    def facets(self, params: QueryParams, generation: Optional[int] = None) -> FacetsResponse:
+        """按当前过滤条件统计各筛选项的成绩数
+
+        每个分面使用除自身以外的全部过滤条件（下拉框里同时展示其它可选值），
+        五个分面的 GROUP BY 合并为一条 UNION ALL 语句。
+        """
+        generation = self._use_generation(generation)
+        key = (generation, "facets", filter_key(params))
+        cached = result_cache.get(key)
+        if cached is not None:
+            return cached
+        
+        selects = []
+        for name, (column, own_filter, _) in FACETS.items():
+            facet_params = params.model_copy(update={own_filter: None}) if own_filter else params
+            value = type_coerce(column, String).label("value")
+            query = self._filtered_query(
+                facet_params, literal(name).label("facet"), value, func.count(Result.id).label("count"),
+                with_organization=(name == "organization")
+            ).group_by(value)
+            selects.append(query.statement)
+        
+        counts = {name: [] for name in FACETS}
+        for facet, value, count in self.db.execute(union_all(*selects)):
+            enum_class = FACETS[facet][2]
+            if enum_class is not None and value is not None:
+                value = enum_class[value].value
+            counts[facet].append(FacetCount(value=value, count=count))
+        for items in counts.values():
+            items.sort(key=lambda item: (-item.count, item.value or ""))
+        
+        response = FacetsResponse(**counts)
+        result_cache.set(key, response)
+        return response
@@ -0,0 +1,300 @@
+# 运动员积分（参照 FIS 积分）
+#
+# 每条完赛成绩的积分 = 比赛积分 + 附加分（场地强度），积分越低越好：
+#   比赛积分 = (总成绩 / 本组别第一名总成绩 - 1) × 项目系数
+#   附加分 = (A + B - C) / 10
+#     A: 前 10 名中赛前积分最好的 5 人的赛前积分之和
+#     B: 全部参赛者中赛前积分最好的 5 人的赛前积分之和
+#     C: A 中这 5 人的本场比赛积分之和
+# 运动员某赛季某项目的积分为本赛季最好两次成绩积分的平均值，只有一次时为该次积分 × SINGLE_RESULT_FACTOR；
+# 本赛季尚无成绩时沿用此前最近一个有成绩的赛季（按赛季名称排序）的积分，都没有时按 RATING_MAX_POINTS 计算附加分。
+#
+# 赛前积分依赖此前的比赛，因此按比赛日期逐日推进，同一天的全部比赛用 NumPy 一次算出。
+# 每个赛季各保存一份状态，比赛的赛季名称不必按日期连续。
+# 导入比赛后只从该比赛日期开始重算，此前各赛季的状态从积分历史表恢复。
+import os
+from datetime import date
+from typing import Dict, List, Optional
+
+import numpy as np
+from sqlalchemy import delete, func, insert, select
+
+from models import (
+    Result, Athlete, Competition, Event, Organization, AthleteRatingHistory,
+    EventTypeEnum, ResultStatusEnum,
+)
+from schemas import RatingEntry, RatingListResponse, RatingHistoryItem, RatingHistoryResponse
+
+# 项目系数（FIS 积分规则中的 F 值）
+EVENT_FACTORS = {
+    EventTypeEnum.DOWNHILL: 1250,
+    EventTypeEnum.SUPER_G: 1190,
+    EventTypeEnum.GIANT_SLALOM: 1010,
+    EventTypeEnum.SLALOM: 730,
+    EventTypeEnum.COMBINED: 1360,
+}
+
+# 没有积分的运动员在计算附加分时的积分，也是附加分的上限
+MAX_POINTS = float(os.getenv("RATING_MAX_POINTS", "330"))
+SINGLE_RESULT_FACTOR = 1.2
+# 附加分取前 TOP_FINISHERS 名 / 全部参赛者中积分最好的 FIELD_SIZE 人
+FIELD_SIZE = 5
+TOP_FINISHERS = 10
+
+_EVENTS = list(EventTypeEnum)
+_EVENT_CODES = {event_type: i for i, event_type in enumerate(_EVENTS)}
+_FACTORS = np.array([EVENT_FACTORS[event_type] for event_type in _EVENTS], dtype=float)
+
+
+def _season_of(season: Optional[str], day: date) -> str:
+    return season or str(day.year)
+
+
+def _rank_within(groups: np.ndarray, key: np.ndarray) -> np.ndarray:
+    """每个元素在所属分组内按 key 升序的名次（从 0 开始）；groups 为 0..G-1 的分组编号"""
+    order = np.lexsort((key, groups))
+    sorted_groups = groups[order]
+    starts = np.searchsorted(sorted_groups, sorted_groups, side="left")
+    rank = np.empty(len(groups), dtype=np.int64)
+    rank[order] = np.arange(len(groups)) - starts
+    return rank
+
+
+class _SeasonState:
+    """一个赛季内各 (项目, 运动员) 最好的两次成绩积分"""
+
+    def __init__(self, athletes: int):
+        self.best1 = np.full((len(_EVENTS), athletes), np.inf)
+        self.best2 = np.full((len(_EVENTS), athletes), np.inf)
+
+    def ratings(self, events: np.ndarray, athletes: np.ndarray) -> np.ndarray:
+        """指定 (项目, 运动员) 的当前积分，没有成绩的为 inf"""
+        best1, best2 = self.best1[events, athletes], self.best2[events, athletes]
+        return np.where(np.isfinite(best2), (best1 + best2) / 2, best1 * SINGLE_RESULT_FACTOR)
+
+    def add(self, events: np.ndarray, athletes: np.ndarray, points: np.ndarray):
+        """加入一批成绩积分；同一 (项目, 运动员) 有多条时按出现次序分层处理"""
+        key = events * self.best1.shape[1] + athletes
+        occurrence = _rank_within(np.unique(key, return_inverse=True)[1], points)
+        for level in range(int(occurrence.max()) + 1 if len(key) else 0):
+            selected = occurrence == level
+            e, a, p = events[selected], athletes[selected], points[selected]
+            best1 = self.best1[e, a]
+            self.best2[e, a] = np.where(p < best1, best1, np.minimum(self.best2[e, a], p))
+            self.best1[e, a] = np.minimum(best1, p)
+
+
+def _race_points(races: np.ndarray, events: np.ndarray, finished: np.ndarray, times: np.ndarray,
+                 prior: np.ndarray):
+    """一批比赛的 (比赛积分, 附加分)；races 为 0..R-1 的组别编号"""
+    count = int(races.max()) + 1
+    times = np.where(finished, times, np.inf)
+    winner = np.full(count, np.inf)
+    np.minimum.at(winner, races[finished], times[finished])
+    with np.errstate(invalid="ignore"):
+        race_points = np.where(finished, (times / winner[races] - 1) * _FACTORS[events], np.nan)
+
+    in_b = _rank_within(races, prior) < FIELD_SIZE
+    place = _rank_within(races, times)
+    candidates = finished & (place < TOP_FINISHERS)
+    in_a = candidates & (_rank_within(races, np.where(candidates, prior, np.inf)) < FIELD_SIZE)
+
+    a = np.bincount(races[in_a], prior[in_a], count)
+    b = np.bincount(races[in_b], prior[in_b], count)
+    c = np.bincount(races[in_a], race_points[in_a], count)
+    penalty = np.clip((a + b - c) / 10, 0, MAX_POINTS)
+    return race_points, penalty[races]
+
+
+def _prior_ratings(states: Dict[str, _SeasonState], season: str, events: np.ndarray,
+                   athletes: np.ndarray) -> np.ndarray:
+    """赛前积分：本赛季积分，没有时依次取此前各赛季的积分，都没有时为 MAX_POINTS"""
+    prior = np.full(len(events), np.inf)
+    for label in sorted((label for label in states if label <= season), reverse=True):
+        missing = ~np.isfinite(prior)
+        if not missing.any():
+            break
+        prior[missing] = states[label].ratings(events[missing], athletes[missing])
+    return np.where(np.isfinite(prior), prior, MAX_POINTS)
+
+
+def _restore(conn, from_date: date, athlete_codes: Dict[str, int], athletes: int) -> Dict[str, _SeasonState]:
+    """从积分历史恢复 from_date 之前各赛季的最好两次积分"""
+    rows = conn.execute(
+        select(AthleteRatingHistory.athlete_id, AthleteRatingHistory.event_type, AthleteRatingHistory.season,
+               AthleteRatingHistory.points)
+        .where(AthleteRatingHistory.date < from_date)
+    ).all()
+    by_season: Dict[str, list] = {}
+    for row in rows:
+        by_season.setdefault(row.season, []).append(row)
+
+    states = {}
+    for season, season_rows in by_season.items():
+        states[season] = _SeasonState(athletes)
+        states[season].add(np.array([_EVENT_CODES[row.event_type] for row in season_rows]),
+                           np.array([athlete_codes[row.athlete_id] for row in season_rows]),
+                           np.array([row.points for row in season_rows]))
+    return states
+
+
+def recompute(conn, from_date: Optional[date] = None) -> int:
+    """重算 from_date（含）之后的全部积分，from_date 为空时全量重算；返回写入的历史条数
+
+    conn 可以是 Session 或 Connection。
+    """
+    if from_date is None:
+        conn.execute(delete(AthleteRatingHistory))
+    else:
+        conn.execute(delete(AthleteRatingHistory).where(AthleteRatingHistory.date >= from_date))
+
+    query = (
+        select(Result.id, Result.athlete_id, Result.competition_id, Result.category_id, Result.status,
+               Result.total_time_cs, Competition.date, Competition.season, Event.name.label("event_type"))
+        .join(Competition, Competition.id == Result.competition_id)
+        .join(Event, Event.id == Result.event_id)
+        .order_by(Competition.date, Competition.season)
+    )
+    if from_date is not None:
+        query = query.where(Competition.date >= from_date)
+    rows = conn.execute(query).all()
+    if not rows:
+        return 0
+
+    athlete_ids = {row.athlete_id for row in rows}
+    if from_date is not None:
+        athlete_ids.update(conn.execute(
+            select(AthleteRatingHistory.athlete_id).where(AthleteRatingHistory.date < from_date).distinct()
+        ).scalars())
+    athlete_codes = {athlete_id: i for i, athlete_id in enumerate(athlete_ids)}
+    athletes = len(athlete_codes)
+
+    seasons = [_season_of(row.season, row.date) for row in rows]
+    ordinals = np.array([row.date.toordinal() for row in rows])
+    events = np.array([_EVENT_CODES[row.event_type] for row in rows])
+    athlete_index = np.array([athlete_codes[row.athlete_id] for row in rows])
+    category_index = np.unique([row.category_id for row in rows], return_inverse=True)[1]
+    finished = np.array([row.status == ResultStatusEnum.COMPLETED and row.total_time_cs is not None
+                         for row in rows])
+    times = np.array([row.total_time_cs if row.total_time_cs is not None else np.nan for row in rows], dtype=float)
+
+    # 赛季名称 -> 该赛季的状态
+    states = {} if from_date is None else _restore(conn, from_date, athlete_codes, athletes)
+
+    history = []
+    # 按 (日期, 赛季) 分批推进
+    boundaries = [0] + [i for i in range(1, len(rows))
+                        if ordinals[i] != ordinals[i - 1] or seasons[i] != seasons[i - 1]] + [len(rows)]
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        season = seasons[start]
+        e = events[start:end]
+        a = athlete_index[start:end]
+        done = finished[start:end]
+        races = np.unique(category_index[start:end], return_inverse=True)[1]
+
+        prior = _prior_ratings(states, season, e, a)
+        race_points, penalty = _race_points(races, e, done, times[start:end], prior)
+        points = race_points + penalty
+        scored = done & np.isfinite(points)
+        state = states.setdefault(season, _SeasonState(athletes))
+        state.add(e[scored], a[scored], points[scored])
+        rating = state.ratings(e, a)
+
+        for offset in np.flatnonzero(scored):
+            row = rows[start + offset]
+            history.append({
+                "result_id": row.id,
+                "athlete_id": row.athlete_id,
+                "competition_id": row.competition_id,
+                "season": season,
+                "event_type": row.event_type,
+                "date": row.date,
+                "race_points": float(race_points[offset]),
+                "penalty": float(penalty[offset]),
+                "points": float(points[offset]),
+                "rating": float(rating[offset]),
+            })
+
+    if history:
+        conn.execute(insert(AthleteRatingHistory), history)
+    return len(history)
+
+
+def rating_list(db, event_type: EventTypeEnum, season: Optional[str] = None, limit: int = 100) -> RatingListResponse:
+    """某赛季某项目的积分排名（每名运动员取该赛季最后一次的赛后积分），season 为空时取最近的赛季"""
+    if season is None:
+        season = db.execute(
+            select(AthleteRatingHistory.season)
+            .where(AthleteRatingHistory.event_type == event_type)
+            .order_by(AthleteRatingHistory.date.desc())
+            .limit(1)
+        ).scalar()
+
+    latest = (
+        select(
+            AthleteRatingHistory.athlete_id,
+            AthleteRatingHistory.rating,
+            AthleteRatingHistory.date,
+            func.count().over(partition_by=AthleteRatingHistory.athlete_id).label("results"),
+            func.row_number().over(
+                partition_by=AthleteRatingHistory.athlete_id,
+                order_by=(AthleteRatingHistory.date.desc(), AthleteRatingHistory.result_id.desc())
+            ).label("row_number"),
+        )
+        .where(AthleteRatingHistory.season == season, AthleteRatingHistory.event_type == event_type)
+        .subquery()
+    )
+    rows = db.execute(
+        select(latest.c.athlete_id, latest.c.rating, latest.c.date, latest.c.results,
+               Athlete.name, Organization.name.label("organization_name"))
+        .join(Athlete, Athlete.id == latest.c.athlete_id)
+        .outerjoin(Organization, Organization.id == Athlete.organization_id)
+        .where(latest.c.row_number == 1)
+        .order_by(latest.c.rating, latest.c.athlete_id)
+        .limit(limit)
+    ).all()
+
+    return RatingListResponse(
+        season=season,
+        event_type=event_type.value,
+        ratings=[
+            RatingEntry(
+                rank=i,
+                athlete_id=row.athlete_id,
+                athlete_name=row.name,
+                organization_name=row.organization_name,
+                rating=round(row.rating, 2),
+                results=row.results,
+                last_date=row.date
+            )
+            for i, row in enumerate(rows, 1)
+        ]
+    )
+
+
+def rating_history(db, athlete_id: str, event_type: Optional[EventTypeEnum] = None) -> RatingHistoryResponse:
+    """运动员的积分历史（按比赛日期排列）"""
+    query = (
+        select(AthleteRatingHistory, Competition.name.label("competition_name"))
+        .join(Competition, Competition.id == AthleteRatingHistory.competition_id)
+        .where(AthleteRatingHistory.athlete_id == athlete_id)
+        .order_by(AthleteRatingHistory.date, AthleteRatingHistory.result_id)
+    )
+    if event_type is not None:
+        query = query.where(AthleteRatingHistory.event_type == event_type)
+
+    history: List[RatingHistoryItem] = []
+    for entry, competition_name in db.execute(query):
+        history.append(RatingHistoryItem(
+            result_id=entry.result_id,
+            competition_id=entry.competition_id,
+            competition_name=competition_name,
+            date=entry.date,
+            season=entry.season,
+            event_type=entry.event_type.value,
+            race_points=round(entry.race_points, 2),
+            penalty=round(entry.penalty, 2),
+            points=round(entry.points, 2),
+            rating=round(entry.rating, 2)
+        ))
+    return RatingHistoryResponse(athlete_id=athlete_id, history=history)
@@ -0,0 +1,308 @@
+# 列式内存读模型
+#
+# 把成绩及其关联的运动员、组织、比赛、项目、组别整体载入内存：
+# 每张表按列存为 NumPy 数组，枚举列做字典编码，字符串驻留（intern）。
+# search_results 的过滤条件转换为向量化的布尔掩码，排序使用构建时预先计算好的顺序，
+# 查询路径不执行任何搜索 SQL。
+#
+# 快照带有构建时的数据版本号，只有与当前版本号一致时才会被使用；
+# 版本号变化后在后台线程重建，构建完成后整体替换引用，重建期间查询回退到 SQL。
+# 通过 READ_MODEL_ENABLED=true 开启。
+import math
+import os
+import sys
+import threading
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import select
+
+from models import (
+    Result, Athlete, Competition, Event, Category, Organization,
+    EventTypeEnum, CategoryNameEnum, GenderEnum, ResultStatusEnum,
+)
+from database import ReadSessionLocal
+from schemas import QueryParams, QueryResponse, ResultResponse
+from services.data_version import get_generation
+from services.name_index import is_indexable
+from services.time_parser import parse_time_cs
+
+READ_MODEL_ENABLED = os.getenv("READ_MODEL_ENABLED", "false").lower() in ("1", "true", "yes")
+
+# 整数列中表示 NULL 的值
+NULL = -1
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if value is not None else None
+
+
+def _normalize_name(value: str) -> str:
+    """与名称全文索引一致：忽略大小写、空白和标点"""
+    return "".join(ch for ch in value.lower() if ch.isalnum())
+
+
+def _enum_code(enum_class, value: str) -> int:
+    """查询参数（枚举值或名称）对应的字典编码，未知值返回 NULL"""
+    members = list(enum_class)
+    for member in members:
+        if value == member.value or value == member.name:
+            return members.index(member)
+    return NULL
+
+
+class ReadModelSnapshot:
+    """某一数据版本的只读列式快照"""
+
+    def __init__(self, db):
+        self.generation = get_generation(db)
+
+        organizations = db.execute(select(Organization.id, Organization.name)).all()
+        organization_codes = {row[0]: i for i, row in enumerate(organizations)}
+        self.organization_names = [_intern(row[1]) for row in organizations]
+        self._organization_search = np.array([_normalize_name(row[1]) for row in organizations] or [""])
+
+        athletes = db.execute(select(Athlete.id, Athlete.name, Athlete.organization_id)).all()
+        athlete_codes = {row[0]: i for i, row in enumerate(athletes)}
+        self.athlete_names = [_intern(row[1]) for row in athletes]
+        self._athlete_search = np.array([_normalize_name(row[1]) for row in athletes] or [""])
+        athlete_organization = np.array(
+            [organization_codes.get(row[2], NULL) for row in athletes] or [NULL], dtype=np.int32
+        )
+
+        competitions = db.execute(
+            select(Competition.id, Competition.name, Competition.date, Competition.season)
+        ).all()
+        competition_codes = {row[0]: i for i, row in enumerate(competitions)}
+        self.competition_names = [_intern(row[1]) for row in competitions]
+        self.competition_dates = [row[2] for row in competitions]
+        self.seasons = sorted({row[3] for row in competitions if row[3] is not None})
+        season_codes = {season: i for i, season in enumerate(self.seasons)}
+        competition_ordinal = np.array([row[2].toordinal() for row in competitions] or [0], dtype=np.int32)
+        competition_season = np.array(
+            [season_codes.get(row[3], NULL) for row in competitions] or [NULL], dtype=np.int32
+        )
+
+        event_types = list(EventTypeEnum)
+        events = db.execute(select(Event.id, Event.name)).all()
+        event_codes = {row[0]: i for i, row in enumerate(events)}
+        event_type = np.array([event_types.index(row[1]) for row in events] or [NULL], dtype=np.int8)
+
+        category_names = list(CategoryNameEnum)
+        genders = list(GenderEnum)
+        categories = db.execute(select(Category.id, Category.name, Category.gender)).all()
+        category_codes = {row[0]: i for i, row in enumerate(categories)}
+        category_name = np.array([category_names.index(row[1]) for row in categories] or [NULL], dtype=np.int8)
+        category_gender = np.array([genders.index(row[2]) for row in categories] or [NULL], dtype=np.int8)
+
+        statuses = list(ResultStatusEnum)
+        ids, athlete, competition, event, category, status, rank, total_cs = [], [], [], [], [], [], [], []
+        self.run1_time, self.run2_time, self.total_time, self.time_behind_leader = [], [], [], []
+        rows = db.execute(select(
+            Result.id, Result.athlete_id, Result.competition_id, Result.event_id, Result.category_id,
+            Result.status, Result.rank, Result.total_time_cs,
+            Result.run1_time, Result.run2_time, Result.total_time, Result.time_behind_leader
+        ).execution_options(yield_per=10000))
+        for row in rows:
+            ids.append(row[0])
+            athlete.append(athlete_codes[row[1]])
+            competition.append(competition_codes[row[2]])
+            event.append(event_codes[row[3]])
+            category.append(category_codes[row[4]])
+            status.append(statuses.index(row[5]))
+            rank.append(NULL if row[6] is None else row[6])
+            total_cs.append(NULL if row[7] is None else row[7])
+            self.run1_time.append(_intern(row[8]))
+            self.run2_time.append(_intern(row[9]))
+            self.total_time.append(_intern(row[10]))
+            self.time_behind_leader.append(_intern(row[11]))
+
+        self.size = len(ids)
+        self.ids = ids
+        self.athlete = np.array(athlete, dtype=np.int32)
+        self.competition = np.array(competition, dtype=np.int32)
+        self.event = np.array(event, dtype=np.int32)
+        self.category = np.array(category, dtype=np.int32)
+        self.status = np.array(status, dtype=np.int8)
+        self.rank = np.array(rank, dtype=np.int32)
+        self.total_time_cs = np.array(total_cs, dtype=np.int64)
+
+        # 按成绩展开的维度列，过滤时直接比较
+        self.organization = athlete_organization[self.athlete]
+        self.date_ordinal = competition_ordinal[self.competition]
+        self.season = competition_season[self.competition]
+        self.event_type = event_type[self.event]
+        self.category_name = category_name[self.category]
+        self.gender = category_gender[self.category]
+
+        # 成绩ID的字典序名次，用于排序和游标比较
+        self._sorted_ids = np.array(sorted(ids) or [""])
+        self.id_rank = np.searchsorted(self._sorted_ids, np.array(ids or [""]))[:self.size]
+
+        # 两种排序方式下的全局顺序：(日期 DESC, ID DESC)、(总成绩 ASC NULL 最后, ID ASC)
+        self.order_date = np.lexsort((-self.id_rank, -self.date_ordinal))
+        time_key = np.where(self.total_time_cs == NULL, np.iinfo(np.int64).max, self.total_time_cs)
+        self.order_time = np.lexsort((self.id_rank, time_key))
+        self._time_key = time_key
+
+    def supports(self, params: QueryParams) -> bool:
+        """名称条件无法走全文索引（SQL 退回 LIKE）时交给 SQL 处理，保持结果一致"""
+        return all(is_indexable(term) for term in (params.athlete_name, params.organization) if term)
+
+    def _mask(self, params: QueryParams) -> np.ndarray:
+        mask = np.ones(self.size, dtype=bool)
+
+        if params.athlete_name:
+            term = _normalize_name(params.athlete_name)
+            matched = np.char.find(self._athlete_search, term) >= 0
+            mask &= matched[self.athlete]
+
+        if params.event_type:
+            mask &= self.event_type == _enum_code(EventTypeEnum, params.event_type)
+
+        if params.category:
+            mask &= self.category_name == _enum_code(CategoryNameEnum, params.category)
+
+        if params.organization:
+            term = _normalize_name(params.organization)
+            matched = np.append(np.char.find(self._organization_search, term) >= 0, False)
+            # NULL（-1）取到追加的 False
+            mask &= matched[self.organization]
+
+        if params.date_from:
+            mask &= self.date_ordinal >= params.date_from.toordinal()
+
+        if params.date_to:
+            mask &= self.date_ordinal <= params.date_to.toordinal()
+
+        if params.season:
+            season_code = self.seasons.index(params.season) if params.season in self.seasons else -2
+            mask &= self.season == season_code
+
+        if params.max_total_time:
+            max_total_time_cs = parse_time_cs(params.max_total_time)
+            if max_total_time_cs is None:
+                raise ValueError("无效的时间格式")
+            mask &= (self.total_time_cs != NULL) & (self.total_time_cs <= max_total_time_cs)
+
+        return mask
+
+    def _cursor_mask(self, params: QueryParams) -> np.ndarray:
+        from services.query_service import decode_cursor
+
+        value, cursor_id = decode_cursor(params.cursor, params.sort)
+        # 游标ID可能已不在快照中：用其插入位置比较，等价于字符串比较
+        if params.sort == "total_time":
+            position = np.searchsorted(self._sorted_ids, cursor_id, side="right")
+            if value is None:
+                return (self.total_time_cs == NULL) & (self.id_rank >= position)
+            return ((self._time_key > value)
+                    | ((self._time_key == value) & (self.id_rank >= position)))
+        position = np.searchsorted(self._sorted_ids, cursor_id, side="left")
+        ordinal = value.toordinal()
+        return (self.date_ordinal < ordinal) | ((self.date_ordinal == ordinal) & (self.id_rank < position))
+
+    def search(self, params: QueryParams) -> QueryResponse:
+        """与 QueryService.search_results 语义一致的内存查询"""
+        from services.query_service import encode_cursor
+
+        mask = self._mask(params)
+        total = int(mask.sum()) if params.count != "none" else None
+
+        order = self.order_time if params.sort == "total_time" else self.order_date
+        if params.cursor:
+            page_mask = mask & self._cursor_mask(params)
+            selected = order[page_mask[order]][:params.page_size + 1]
+        else:
+            start = (params.page - 1) * params.page_size
+            selected = order[mask[order]][start:start + params.page_size + 1]
+
+        next_cursor = None
+        if len(selected) > params.page_size:
+            selected = selected[:params.page_size]
+            last = int(selected[-1])
+            if params.sort == "total_time":
+                value = None if self.total_time_cs[last] == NULL else int(self.total_time_cs[last])
+            else:
+                value = self.competition_dates[self.competition[last]]
+            next_cursor = encode_cursor(params.sort, value, self.ids[last])
+
+        total_pages = None
+        if total is not None:
+            total_pages = math.ceil(total / params.page_size) if total > 0 else 0
+
+        return QueryResponse(
+            results=[self._response(int(i)) for i in selected],
+            total=total,
+            page=params.page,
+            page_size=params.page_size,
+            total_pages=total_pages,
+            next_cursor=next_cursor
+        )
+
+    def _response(self, i: int) -> ResultResponse:
+        organization = self.organization[i]
+        competition = self.competition[i]
+        return ResultResponse(
+            id=self.ids[i],
+            athlete_name=self.athlete_names[self.athlete[i]],
+            organization_name=self.organization_names[organization] if organization != NULL else None,
+            competition_name=self.competition_names[competition],
+            competition_date=self.competition_dates[competition],
+            event_name=list(EventTypeEnum)[self.event_type[i]].value,
+            category_name=list(CategoryNameEnum)[self.category_name[i]].value,
+            gender=list(GenderEnum)[self.gender[i]].value,
+            run1_time=self.run1_time[i],
+            run2_time=self.run2_time[i],
+            total_time=self.total_time[i],
+            rank=None if self.rank[i] == NULL else int(self.rank[i]),
+            time_behind_leader=self.time_behind_leader[i],
+            total_time_cs=None if self.total_time_cs[i] == NULL else int(self.total_time_cs[i]),
+            status=list(ResultStatusEnum)[self.status[i]].value
+        )
+
+
+class ReadModel:
+    """持有当前快照，负责后台重建"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.snapshot: Optional[ReadModelSnapshot] = None
+        self._rebuild_lock = threading.Lock()
+
+    def rebuild(self):
+        """同步重建快照，完成后整体替换"""
+        db = self.session_factory()
+        try:
+            snapshot = ReadModelSnapshot(db)
+        finally:
+            db.close()
+        self.snapshot = snapshot
+
+    def _rebuild_in_background(self):
+        if not self._rebuild_lock.acquire(blocking=False):
+            return
+
+        def run():
+            try:
+                self.rebuild()
+            except Exception as e:
+                print(f"❌ 读模型重建失败: {str(e)}")
+            finally:
+                self._rebuild_lock.release()
+
+        threading.Thread(target=run, name="read-model-rebuild", daemon=True).start()
+
+    def current(self, generation: int) -> Optional[ReadModelSnapshot]:
+        """返回与该数据版本一致的快照；不一致时触发后台重建并返回 None"""
+        if not READ_MODEL_ENABLED:
+            return None
+        snapshot = self.snapshot
+        if snapshot is not None and snapshot.generation == generation:
+            return snapshot
+        if snapshot is None or generation > snapshot.generation:
+            self._rebuild_in_background()
+        return None
+
+
+read_model = ReadModel(ReadSessionLocal)
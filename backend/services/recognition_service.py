@@ -1,35 +1,74 @@
 # 识别服务 - PDF/图片文字识别和数据提取
 import os
 import json
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
 from typing import Dict, List, Optional, Tuple
-import pdfplumber
 from PIL import Image
 import pytesseract
-import boto3
 from dotenv import load_dotenv
+from services.cache import DiskCache
+from services.llm_extraction import RateLimiter, merge_results, split_chunks
+from services.model_client import create_model_client
+from services.pdf_extraction import extract_pdf_text
 
 load_dotenv()
 
+# 提取提示词的版本，修改提示词或返回格式时递增，使旧的缓存结果失效
+PROMPT_VERSION = 2
+
+# (文本, 模型, 提示词版本) 的哈希 -> 模型返回的结构化数据；只缓存成功的结果
+structured_cache = DiskCache(
+    Path(os.getenv("EXTRACTION_CACHE_DIR", "./cache/extraction")) / "structured",
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+)
+
+# 分块提取：每块最大字符数 / 每次调用的 max_tokens / 同时进行的模型调用数 / 每分钟调用上限（0 不限制）
+LLM_CHUNK_MAX_CHARS = int(os.getenv("LLM_CHUNK_MAX_CHARS", "4000"))
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "8192"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+
+# 所有导入任务共用，保证并发和速率限制对整个进程生效
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_CONCURRENCY, thread_name_prefix="llm")
+_rate_limiter = RateLimiter(LLM_REQUESTS_PER_MINUTE)
+
 class RecognitionService:
-    def __init__(self):
-        self.bedrock_client = boto3.client(
-            service_name='bedrock-runtime',
-            region_name=os.getenv("AWS_REGION", "us-west-2")
-        )
-        self.model_id = "us.anthropic.claude-3-5-haiku-20241022-v1:0"
+    def __init__(self, model_client=None):
+        self.model_client = model_client or create_model_client()
+        self.model_id = self.model_client.model_id
     
     def _extract_pdf_text(self, file_path: str) -> str:
-        """从 PDF 提取文本"""
-        text = ""
-        with pdfplumber.open(file_path) as pdf:
-            for page in pdf.pages:
-                page_text = page.extract_text()
-                if page_text:
-                    text += page_text + "\n"
-        return text
+        """从 PDF 提取文本（多页文件按页并行提取）"""
+        return extract_pdf_text(file_path)
     
+    def _cache_key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model_id}\0{PROMPT_VERSION}\0{text}".encode("utf-8")).hexdigest()
+
     def _extract_structured_data(self, text: str) -> Dict:
-        """使用 AWS Bedrock Claude 从文本中提取结构化数据"""
+        """按组别切块后并发调用模型提取结构化数据，合并各块结果；任一块失败时返回带 error 的结果"""
+        chunks = split_chunks(text, LLM_CHUNK_MAX_CHARS)
+        payloads = list(_llm_executor.map(self._extract_chunk, chunks))
+        
+        errors = [payload["error"] for payload in payloads if "error" in payload]
+        if errors:
+            return {
+                "competition": {},
+                "event": {},
+                "results": [],
+                "confidence": 0.0,
+                "error": f"{len(errors)}/{len(chunks)} 个分块提取失败: {errors[0]}"
+            }
+        return merge_results(payloads)
+
+    def _extract_chunk(self, text: str) -> Dict:
+        """提取一个文本块（相同文本、模型和提示词版本直接使用缓存）"""
+        cache_key = self._cache_key(text)
+        cached = structured_cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         prompt = f"""你是一个专业的高山滑雪比赛成绩数据提取助手。请从以下文本中提取比赛成绩信息。
 
 文本内容：
@@ -68,28 +107,12 @@ class RecognitionService:
 2. 如果某个字段无法识别，请设置为 null
 3. 时间格式保持原样
 4. 从文本中的标题行识别组别和性别
-5. **只返回纯 JSON 对象，不要包含任何解释文字、markdown 标记或其他内容**"""
+5. 文本可能只是成绩单的一部分，只提取其中出现的成绩记录
+6. **只返回纯 JSON 对象，不要包含任何解释文字、markdown 标记或其他内容**"""
         
         try:
-            request_body = {
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 8192,
-                "temperature": 0.1,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            }
-            
-            response = self.bedrock_client.invoke_model(
-                modelId=self.model_id,
-                body=json.dumps(request_body)
-            )
-            
-            response_body = json.loads(response['body'].read())
-            content = response_body['content'][0]['text']
+            _rate_limiter.acquire()
+            content = self.model_client.complete(prompt, LLM_MAX_TOKENS)
             
             if '```json' in content:
                 content = content.split('```json')[1].split('```')[0].strip()
@@ -104,10 +127,11 @@ class RecognitionService:
             
             content = content.strip()
             result = json.loads(content)
+            structured_cache.set(cache_key, result)
             return result
         
         except Exception as e:
-            print(f"❌ Bedrock 提取失败: {str(e)}")
+            print(f"❌ 模型提取失败: {str(e)}")
             return {
                 "competition": {},
                 "event": {},
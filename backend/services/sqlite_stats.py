@@ -0,0 +1,81 @@
+# SQLite 统计信息维护
+#
+# 查询规划器按 ANALYZE 写入 sqlite_stat1 的行数和索引选择度选择索引。迁移时执行的 ANALYZE
+# 只反映当时的数据量（新建的数据库上是空表），数据增长后统计信息会越来越偏离实际。
+# 写入会话提交前检查各表当前行数与统计信息中记录的行数，相差超过 STATS_STALE_RATIO 倍
+# 或没有统计信息时，在同一事务中重新 ANALYZE 该表。行数翻倍才重新统计一次，
+# 几十万行的成绩表完整 ANALYZE 约 0.2 秒，分摊到每次导入的开销很小。
+import os
+
+from sqlalchemy import event, text
+
+from models import (
+    Result, Athlete, Organization, Competition, Event, Category,
+    LeaderboardEntry, AthleteStats, AthleteSeasonBest, OrganizationPlaces, AthleteRatingHistory,
+)
+
+STATS_STALE_RATIO = float(os.getenv("STATS_STALE_RATIO", "2"))
+
+ANALYZED_TABLES = tuple(model.__tablename__ for model in (
+    Result, Athlete, Organization, Competition, Event, Category,
+    LeaderboardEntry, AthleteStats, AthleteSeasonBest, OrganizationPlaces, AthleteRatingHistory,
+))
+
+_DIRTY_KEY = "sqlite_stats.dirty"
+
+
+def _is_stale(rows: int, recorded) -> bool:
+    if recorded is None:
+        return rows > 0
+    return max(rows, 1) / max(recorded, 1) > STATS_STALE_RATIO or max(recorded, 1) / max(rows, 1) > STATS_STALE_RATIO
+
+
+def refresh(conn) -> list:
+    """重新统计行数与统计信息相差过大的表，返回重新统计的表名；conn 可以是 Session 或 Connection"""
+    dialect = conn.get_bind().dialect if hasattr(conn, "get_bind") else conn.dialect
+    if dialect.name != "sqlite":
+        return []
+    has_stats = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'"
+    )).first() is not None
+    recorded = {}
+    if has_stats:
+        for table, stat in conn.execute(text("SELECT tbl, stat FROM sqlite_stat1")):
+            if table in ANALYZED_TABLES and stat:
+                recorded[table] = max(recorded.get(table, 0), int(stat.split()[0]))
+
+    stale = [
+        table for table in ANALYZED_TABLES
+        if _is_stale(conn.execute(text(f"SELECT count(*) FROM {table}")).scalar(), recorded.get(table))
+    ]
+    for table in stale:
+        conn.execute(text(f"ANALYZE {table}"))
+    return stale
+
+
+def _after_flush(session, flush_context):
+    session.info[_DIRTY_KEY] = True
+
+
+def _do_orm_execute(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[_DIRTY_KEY] = True
+
+
+def _before_commit(session):
+    # refresh 执行的语句本身也会标记 dirty，完成后再清除
+    if session.info.get(_DIRTY_KEY):
+        refresh(session)
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def _after_rollback(session):
+    session.info.pop(_DIRTY_KEY, None)
+
+
+def install(session_factory):
+    """为写入会话注册统计信息检查；需在 derived_tables.install 之后调用，派生表写入后再检查"""
+    event.listen(session_factory, "after_flush", _after_flush)
+    event.listen(session_factory, "do_orm_execute", _do_orm_execute)
+    event.listen(session_factory, "before_commit", _before_commit)
+    event.listen(session_factory, "after_rollback", _after_rollback)
@@ -0,0 +1,223 @@
+# 运动员/组织输入提示服务
+#
+# 启动时把所有运动员和组织的汉字名、全拼、首字母写入内存中的有序数组，
+# 前缀查询用 bisect 定位，输入提示完全不访问数据库。
+# 后台线程每 SUGGEST_REFRESH_SECONDS 秒检查一次数据版本号，有变化时只读取 updated_at
+# 不早于上次同步时间的运动员和组织（组织改名时连同其运动员）增量更新；行数与索引不一致
+# （删除或不经 ORM 写入的行）时才整体重新加载。
+import os
+import threading
+import traceback
+from bisect import bisect_left, insort
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from pypinyin import lazy_pinyin, pinyin, Style
+from sqlalchemy import func, select
+
+from models import Athlete, Organization
+from schemas import SuggestItem
+from services.data_version import get_generation
+
+REFRESH_SECONDS = float(os.getenv("SUGGEST_REFRESH_SECONDS", "5"))
+
+# 超过该数量的变更直接整体重建，而不是逐条插入
+BULK_REBUILD_THRESHOLD = 1000
+
+# 增量同步时多读取的时间范围：updated_at 在 flush 时生成，提交可能晚于生成时间
+SYNC_OVERLAP = timedelta(seconds=60)
+
+
+def _first_readings(name: str) -> List[str]:
+    """首字（姓氏）的所有读音，如 曾 -> ceng、zeng；非汉字时返回空列表"""
+    if not name or not "\u4e00" <= name[0] <= "\u9fff":
+        return []
+    return pinyin(name[0], style=Style.NORMAL, heteronym=True)[0]
+
+
+def search_keys(name: str) -> List[str]:
+    """名称的检索键：汉字名、全拼、首字母（均为小写、去空格）
+
+    lazy_pinyin 每个字只取一个读音，曾、单、解、查、仇、朴 等多音姓氏会取错，
+    首字的每个读音都生成一组全拼和首字母。
+    """
+    normalized = "".join(name.split()).lower()
+    full = lazy_pinyin(normalized)
+    initials = lazy_pinyin(normalized, style=Style.FIRST_LETTER)
+    keys = [normalized, "".join(full).lower(), "".join(initials).lower()]
+    for reading in _first_readings(normalized):
+        keys.append((reading + "".join(full[1:])).lower())
+        keys.append((reading[0] + "".join(initials[1:])).lower())
+    return list(dict.fromkeys(keys))
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (检索键, 类型, ID)，按字典序排列
+        self._entries: List[Tuple[str, str, str]] = []
+        # (类型, ID) -> (名称, 所属组织)
+        self._docs: Dict[Tuple[str, str], Tuple[str, Optional[str]]] = {}
+        self._generation: Optional[int] = None
+        # 已同步的最大 updated_at
+        self._synced_until = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _doc_entries(self, ref: Tuple[str, str], name: str) -> List[Tuple[str, str, str]]:
+        return [(key, ref[0], ref[1]) for key in search_keys(name)]
+
+    def add(self, kind: str, ref_id: str, name: str, organization_name: Optional[str] = None):
+        """新增或更新一条记录"""
+        with self._lock:
+            self._remove_locked((kind, ref_id))
+            self._docs[(kind, ref_id)] = (name, organization_name)
+            for entry in self._doc_entries((kind, ref_id), name):
+                insort(self._entries, entry)
+
+    def remove(self, kind: str, ref_id: str):
+        """删除一条记录"""
+        with self._lock:
+            self._remove_locked((kind, ref_id))
+
+    def _remove_locked(self, ref: Tuple[str, str]):
+        doc = self._docs.pop(ref, None)
+        if doc is None:
+            return
+        for entry in self._doc_entries(ref, doc[0]):
+            index = bisect_left(self._entries, entry)
+            if index < len(self._entries) and self._entries[index] == entry:
+                del self._entries[index]
+
+    def _replace_all(self, docs: Dict[Tuple[str, str], Tuple[str, Optional[str]]]):
+        entries = []
+        for ref, (name, _) in docs.items():
+            entries.extend(self._doc_entries(ref, name))
+        entries.sort()
+        with self._lock:
+            self._entries = entries
+            self._docs = docs
+
+    def _athletes_query(self):
+        return (select(Athlete.id, Athlete.name, Organization.name)
+                .outerjoin(Organization, Athlete.organization_id == Organization.id))
+
+    def _load_all(self, db):
+        docs = {}
+        for athlete_id, name, organization_name in db.execute(self._athletes_query()):
+            docs[("athlete", athlete_id)] = (name, organization_name)
+        for organization_id, name in db.execute(select(Organization.id, Organization.name)):
+            docs[("organization", organization_id)] = (name, None)
+        self._replace_all(docs)
+
+    def _load_changed(self, db, since) -> Dict[Tuple[str, str], Tuple[str, Optional[str]]]:
+        """读取 since 之后修改的记录中与索引不一致的部分"""
+        docs = {}
+        organizations = db.execute(
+            select(Organization.id, Organization.name).where(Organization.updated_at >= since)
+        ).all()
+        for organization_id, name in organizations:
+            docs[("organization", organization_id)] = (name, None)
+        for athlete_id, name, organization_name in db.execute(
+            self._athletes_query().where(Athlete.updated_at >= since)
+        ):
+            docs[("athlete", athlete_id)] = (name, organization_name)
+        if organizations:
+            # 组织改名后其运动员显示的组织名称也要更新
+            for athlete_id, name, organization_name in db.execute(
+                self._athletes_query().where(Athlete.organization_id.in_([row.id for row in organizations]))
+            ):
+                docs[("athlete", athlete_id)] = (name, organization_name)
+
+        return {ref: doc for ref, doc in docs.items() if self._docs.get(ref) != doc}
+
+    def _counts_match(self, db) -> bool:
+        athletes = db.execute(select(func.count()).select_from(Athlete)).scalar()
+        organizations = db.execute(select(func.count()).select_from(Organization)).scalar()
+        with self._lock:
+            indexed = sum(1 for kind, _ in self._docs if kind == "athlete")
+            return indexed == athletes and len(self._docs) - indexed == organizations
+
+    def sync(self, db):
+        """与数据库同步：版本号未变时不做任何事，否则增量更新"""
+        generation = get_generation(db)
+        if generation == self._generation:
+            return
+
+        synced_until = max(
+            (value for value in (db.execute(select(func.max(Athlete.updated_at))).scalar(),
+                                 db.execute(select(func.max(Organization.updated_at))).scalar())
+             if value is not None),
+            default=None
+        )
+        if self._synced_until is None or not self._docs:
+            self._load_all(db)
+        else:
+            changed = self._load_changed(db, self._synced_until - SYNC_OVERLAP)
+            if len(changed) > BULK_REBUILD_THRESHOLD:
+                self._load_all(db)
+            else:
+                for ref, doc in changed.items():
+                    self.add(ref[0], ref[1], *doc)
+                if not self._counts_match(db):
+                    self._load_all(db)
+
+        self._synced_until = synced_until
+        self._generation = generation
+
+    def start(self, session_factory):
+        """启动后台同步线程"""
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(session_factory,), name="suggest-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, session_factory):
+        while not self._stop.wait(REFRESH_SECONDS):
+            db = session_factory()
+            try:
+                self.sync(db)
+            except Exception:
+                traceback.print_exc()
+            finally:
+                db.close()
+
+    def suggest(self, prefix: str, limit: int = 10) -> List[SuggestItem]:
+        """按汉字、全拼或首字母前缀查询，返回不重复的运动员/组织"""
+        prefix = "".join(prefix.split()).lower()
+        if not prefix:
+            return []
+
+        items = []
+        seen = set()
+        with self._lock:
+            index = bisect_left(self._entries, (prefix,))
+            while index < len(self._entries) and len(items) < limit:
+                key, kind, ref_id = self._entries[index]
+                if not key.startswith(prefix):
+                    break
+                index += 1
+                if (kind, ref_id) in seen:
+                    continue
+                seen.add((kind, ref_id))
+                name, organization_name = self._docs[(kind, ref_id)]
+                items.append(SuggestItem(
+                    id=ref_id,
+                    name=name,
+                    type=kind,
+                    organization_name=organization_name
+                ))
+        return items
+
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,97 @@
+# 成绩时间解析
+#
+# 成绩表中的时间以字符串保存（如 '0:00:24.07'、'1:02.35'、'+1.00'），并混有 'DQ'、'DNF' 等标记。
+# 这里统一解析为整数百分之一秒（centisecond），写入 results 表的 *_cs 列，
+# 以便数据库直接按时间排序、过滤和计算差距。
+import re
+from typing import Iterable, List, Optional
+
+from sqlalchemy import text
+
+_TIME_PATTERN = re.compile(r"^\+?(?:(?:(\d+):)?(\d{1,2}):)?(\d{1,2})(?:[.,](\d{1,3}))?$")
+
+# 成绩字符串列 -> 百分之一秒列
+TIME_COLUMNS = {
+    "run1_time": "run1_time_cs",
+    "run2_time": "run2_time_cs",
+    "total_time": "total_time_cs",
+    "time_behind_leader": "time_behind_leader_cs",
+}
+
+
+def parse_time_cs(value: Optional[str]) -> Optional[int]:
+    """把时间字符串解析为百分之一秒，无法解析（含 DQ/DNF 等标记）时返回 None"""
+    if not value:
+        return None
+    match = _TIME_PATTERN.match(value.strip())
+    if not match:
+        return None
+    hours, minutes, seconds, fraction = match.groups()
+    total = (int(hours or 0) * 3600 + int(minutes or 0) * 60 + int(seconds)) * 100
+    if fraction:
+        # 补齐到千分之一秒后四舍五入到百分之一秒
+        total += (int(fraction.ljust(3, "0")) + 5) // 10
+    return total
+
+
+def parse_times(values: Iterable[Optional[str]]) -> List[Optional[int]]:
+    """批量解析；同一批中重复出现的字符串只解析一次"""
+    parsed = {}
+    out = []
+    for value in values:
+        if value not in parsed:
+            parsed[value] = parse_time_cs(value)
+        out.append(parsed[value])
+    return out
+
+
+def format_time_cs(value: Optional[int]) -> Optional[str]:
+    """把百分之一秒格式化为 'H:MM:SS.ff'"""
+    if value is None:
+        return None
+    seconds, centis = divmod(value, 100)
+    minutes, seconds = divmod(seconds, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}.{centis:02d}"
+
+
+def apply_time_columns(result):
+    """根据时间字符串设置 Result 对象的百分之一秒列"""
+    for source, target in TIME_COLUMNS.items():
+        setattr(result, target, parse_time_cs(getattr(result, source)))
+
+
+def backfill(conn, only_missing: bool = True, batch_size: int = 5000) -> int:
+    """为已有成绩回填百分之一秒列，返回更新的行数
+
+    only_missing 为 True 时只处理有时间字符串但尚未解析的行；
+    解析规则变化后可传 False 全量重算。
+    """
+    sources = list(TIME_COLUMNS)
+    conditions = ["id > :last_id"]
+    if only_missing:
+        conditions.append("(" + " OR ".join(
+            f"({source} IS NOT NULL AND {target} IS NULL)" for source, target in TIME_COLUMNS.items()
+        ) + ")")
+    select_batch = text(
+        f"SELECT id, {', '.join(sources)} FROM results "
+        f"WHERE {' AND '.join(conditions)} ORDER BY id LIMIT :limit"
+    )
+    assignments = ", ".join(f"{target} = :{target}" for target in TIME_COLUMNS.values())
+    update = text(f"UPDATE results SET {assignments} WHERE id = :id")
+
+    updated = 0
+    last_id = ""
+    while True:
+        batch = conn.execute(select_batch, {"last_id": last_id, "limit": batch_size}).fetchall()
+        if not batch:
+            break
+        columns = {target: parse_times(row[i + 1] for row in batch)
+                   for i, target in enumerate(TIME_COLUMNS.values())}
+        conn.execute(update, [
+            {"id": row[0], **{target: values[j] for target, values in columns.items()}}
+            for j, row in enumerate(batch)
+        ])
+        updated += len(batch)
+        last_id = batch[-1][0]
+    return updated
@@ -0,0 +1,120 @@
+# 运动员成绩趋势（ECharts 折线图数据）
+#
+# 数据来自成绩单物化表 leaderboard_entries：其中已有名次、总成绩和与第一名的差距，
+# 按运动员读取只走 ix_leaderboard_entries_athlete，不再关联组别内其它成绩计算差距。
+# 序列可按比赛、月份或赛季汇总；max_points 限制每条序列的点数，超出时用
+# LTTB（Largest-Triangle-Three-Buckets）算法按落后百分比降采样，保留曲线形状。
+from collections import OrderedDict
+from typing import List, Optional
+
+from sqlalchemy import select
+
+from models import Athlete, Competition, Event, LeaderboardEntry, EventTypeEnum, ResultStatusEnum
+from schemas import TrendPoint, TrendSeries, AthleteTrendResponse
+
+def _period(bucket: str, row) -> str:
+    if bucket == "month":
+        return row.date.strftime("%Y-%m")
+    if bucket == "season":
+        return row.season or str(row.date.year)
+    return row.competition_id
+
+
+def _mean(values: list) -> Optional[float]:
+    values = [v for v in values if v is not None]
+    return round(sum(values) / len(values), 2) if values else None
+
+
+def _aggregate(bucket: str, rows: list) -> List[TrendPoint]:
+    groups = OrderedDict()
+    for row in rows:
+        groups.setdefault(_period(bucket, row), []).append(row)
+
+    points = []
+    for period, group in groups.items():
+        ranks = [row.rank for row in group if row.rank is not None]
+        pct_behind = [
+            row.behind_cs / (row.total_time_cs - row.behind_cs) * 100
+            if row.behind_cs is not None and row.total_time_cs > row.behind_cs else None
+            for row in group
+        ]
+        points.append(TrendPoint(
+            period=group[0].competition_name if bucket == "competition" else period,
+            date=group[0].date,
+            races=len(group),
+            total_time_cs=_mean([row.total_time_cs for row in group]),
+            pct_behind=_mean(pct_behind),
+            best_rank=min(ranks) if ranks else None,
+            avg_rank=_mean(ranks)
+        ))
+    return points
+
+
+def downsample(points: List[TrendPoint], max_points: int) -> List[TrendPoint]:
+    """LTTB 降采样（max_points 至少为 3）：保留首尾点，中间每个分段取与前一个选中点、
+    下一分段均值构成的三角形面积最大的点"""
+    if max_points >= len(points):
+        return points
+
+    def xy(point: TrendPoint):
+        return point.date.toordinal(), point.pct_behind if point.pct_behind is not None else 0.0
+
+    sampled = [points[0]]
+    size = (len(points) - 2) / (max_points - 2)
+    selected = 0
+    for i in range(max_points - 2):
+        start = int(i * size) + 1
+        end = int((i + 1) * size) + 1
+        next_end = min(int((i + 2) * size) + 1, len(points))
+        following = points[end:next_end] or [points[-1]]
+        avg_x = sum(xy(p)[0] for p in following) / len(following)
+        avg_y = sum(xy(p)[1] for p in following) / len(following)
+
+        ax, ay = xy(points[selected])
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            bx, by = xy(points[j])
+            area = abs((ax - avg_x) * (by - ay) - (ax - bx) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        sampled.append(points[best])
+        selected = best
+    sampled.append(points[-1])
+    return sampled
+
+
+def athlete_trend(db, athlete_id: str, event_type: Optional[EventTypeEnum] = None, bucket: str = "competition",
+                  max_points: Optional[int] = None) -> Optional[AthleteTrendResponse]:
+    """运动员各项目的成绩趋势（只含完赛成绩），运动员不存在时返回 None"""
+    athlete_name = db.execute(select(Athlete.name).where(Athlete.id == athlete_id)).scalar()
+    if athlete_name is None:
+        return None
+
+    query = (
+        select(LeaderboardEntry.competition_id, LeaderboardEntry.rank, LeaderboardEntry.total_time_cs,
+               LeaderboardEntry.behind_cs, Competition.name.label("competition_name"), Competition.date,
+               Competition.season, Event.name.label("event_type"))
+        .join(Competition, Competition.id == LeaderboardEntry.competition_id)
+        .join(Event, Event.id == LeaderboardEntry.event_id)
+        .where(
+            LeaderboardEntry.athlete_id == athlete_id,
+            LeaderboardEntry.status == ResultStatusEnum.COMPLETED,
+            LeaderboardEntry.total_time_cs.is_not(None),
+        )
+        .order_by(Competition.date, Competition.id)
+    )
+    if event_type is not None:
+        query = query.where(Event.name == event_type)
+
+    by_event = OrderedDict()
+    for row in db.execute(query):
+        by_event.setdefault(row.event_type, []).append(row)
+
+    series = []
+    for event, rows in by_event.items():
+        points = _aggregate(bucket, rows)
+        if max_points:
+            points = downsample(points, max_points)
+        series.append(TrendSeries(event_type=event.value, points=points))
+
+    return AthleteTrendResponse(athlete_id=athlete_id, athlete_name=athlete_name, bucket=bucket, series=series)
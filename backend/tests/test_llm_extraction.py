@@ -0,0 +1,118 @@
+# 成绩单分块提取测试：按组别切块、经桩客户端逐块提取后合并
+import json
+import re
+
+from services.llm_extraction import is_category_header, merge_results, split_chunks
+from services.model_client import StubModelClient
+
+PREAMBLE = "2024 北京市青少年高山滑雪锦标赛\n2024-01-20 延庆"
+
+_SECTION_RE = re.compile(r"^(U\d+|[甲乙丙丁]组)\s*([男女])")
+STATUSES = {"未完成", "未出发", "取消资格"}
+_TIME_RE = re.compile(r"\d+:\d{2}\.\d{2}")
+
+
+def _extract(prompt: str) -> dict:
+    """桩模型：按块内最近的组别标题行给每条成绩标注组别，名次/时间缺失时为 None"""
+    results, category, gender = [], None, None
+    for line in prompt.splitlines():
+        section = _SECTION_RE.match(line)
+        if section and is_category_header(line):
+            category, gender = section.groups()
+            continue
+        tokens = line.split()
+        names = [token for token in tokens if re.fullmatch(r"[一-鿿]{2,3}", token) and token not in STATUSES]
+        if category is None or len(names) < 2:
+            continue
+        times = _TIME_RE.findall(line)
+        results.append({
+            "rank": int(tokens[0]) if tokens[0].isdigit() else None,
+            "athlete_name": names[0],
+            "organization": names[1],
+            "category": category,
+            "gender": gender,
+            "total_time": times[-1] if times else None,
+        })
+    return {"competition": {"name": PREAMBLE.splitlines()[0]}, "event": {"name": "大回转"},
+            "results": results, "confidence": 0.9}
+
+
+def _run(text: str, max_chars: int):
+    client = StubModelClient(handler=_extract)
+    chunks = split_chunks(text, max_chars)
+    merged = merge_results([json.loads(client.complete(chunk, 1024)) for chunk in chunks])
+    return chunks, merged, client
+
+
+def _by_name(merged: dict) -> dict:
+    names = [result["athlete_name"] for result in merged["results"]]
+    assert len(names) == len(set(names)), names
+    return {result["athlete_name"]: result for result in merged["results"]}
+
+
+def test_result_rows_with_category_are_not_headers():
+    assert is_category_header("U13 男子")
+    assert is_category_header("非正式总成绩_高山滑雪大回转_丁组_女子")
+    assert not is_category_header("DNF 14 王五 丰台区 U13 男")
+    assert not is_category_header("未完成 王二 海淀区 U11女")
+    assert not is_category_header("1 张三 海淀区 U13 男 1:02.34")
+
+
+def test_dnf_rows_stay_in_their_category():
+    dnf_rows = ["DNF 14 王五 丰台区 U13 男", "未完成 王二 海淀区 U13男"]
+    text = "\n".join([
+        PREAMBLE,
+        "U13 男子",
+        "1 张三 海淀区 1:02.34",
+        dnf_rows[0],
+        "2 李四 朝阳区 1:03.10",
+        "3 周七 东城区 1:04.20",
+        dnf_rows[1],
+        "4 吴八 通州区 1:05.00",
+        "U11 女子",
+        "1 赵敏 西城区 1:10.00",
+    ])
+    chunks, merged, _ = _run(text, 60)
+
+    assert len(chunks) > 2
+    for chunk in chunks:
+        assert chunk.splitlines()[2] in ("U13 男子", "U11 女子")
+    for row in dnf_rows:
+        assert sum(row in chunk.splitlines() for chunk in chunks) == 1
+    results = _by_name(merged)
+    assert set(results) == {"张三", "王五", "李四", "周七", "王二", "吴八", "赵敏"}
+    assert all((results[name]["category"], results[name]["gender"]) == ("U13", "男") for name in ("王五", "王二", "吴八"))
+    assert (results["赵敏"]["category"], results["赵敏"]["gender"]) == ("U11", "女")
+
+
+def test_long_section_is_split_under_its_header():
+    names = [f"选手{chr(0x4e00 + i)}" for i in range(30)]
+    rows = [f"{i + 1} {name} 海淀区 1:{i + 10:02d}.00" for i, name in enumerate(names)]
+    text = "\n".join([PREAMBLE, "丁组 女子"] + rows)
+    chunks, merged, client = _run(text, 200)
+
+    assert len(chunks) > 1 and client.calls == len(chunks)
+    assert all(chunk.startswith(f"{PREAMBLE}\n丁组 女子\n") for chunk in chunks)
+    results = _by_name(merged)
+    assert set(results) == set(names)
+    assert all((r["category"], r["gender"]) == ("丁组", "女") for r in results.values())
+    assert merged["competition"]["name"] == PREAMBLE.splitlines()[0]
+
+
+def test_rows_repeated_across_chunks_are_merged():
+    # 分页处重复的一行：第一页缺时间，第二页完整
+    text = "\n".join([
+        PREAMBLE,
+        "U13 男子",
+        "1 张三 海淀区 1:02.34",
+        "2 李四 朝阳区",
+        "U13 男子",
+        "2 李四 朝阳区 1:03.10",
+        "3 王五 丰台区 1:04.00",
+    ])
+    chunks, merged, _ = _run(text, 40)
+
+    assert len(chunks) > 1
+    results = _by_name(merged)
+    assert set(results) == {"张三", "李四", "王五"}
+    assert results["李四"]["total_time"] == "1:03.10"
@@ -0,0 +1,89 @@
+# 成绩查询服务测试：每页执行的 SQL 条数与 page_size 无关
+from datetime import date
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+import migrations
+from models import (
+    Base, Organization, Athlete, Competition, Event, Category, Result,
+    GenderEnum, EventTypeEnum, CategoryNameEnum, ResultStatusEnum,
+)
+from schemas import QueryParams
+from services import query_service
+from services.query_service import QueryService
+
+ATHLETES = 40
+COMPETITIONS = 5
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    """小型 SQLite 数据库：40 名运动员各参加 5 场比赛，共 200 条成绩"""
+    path = tmp_path_factory.mktemp("db") / "ski.db"
+    engine = create_engine(f"sqlite:///{path}")
+    Base.metadata.create_all(bind=engine)
+    migrations.upgrade(engine)
+
+    db = sessionmaker(bind=engine)()
+    organizations = [Organization(id=f"org{i}", name=f"测试俱乐部{i}", type="俱乐部") for i in range(3)]
+    athletes = [
+        Athlete(id=f"ath{i:02d}", name=f"李知涵{i:02d}", gender=GenderEnum.FEMALE,
+                organization_id=organizations[i % 3].id if i % 4 else None)
+        for i in range(ATHLETES)
+    ]
+    db.add_all(organizations + athletes)
+    for c in range(COMPETITIONS):
+        competition = Competition(id=f"comp{c}", name=f"测试赛{c}", date=date(2024, 1, c + 1), season="2023-2024")
+        race = Event(id=f"evt{c}", competition_id=competition.id, name=EventTypeEnum.GIANT_SLALOM)
+        category = Category(id=f"cat{c}", event_id=race.id, name=CategoryNameEnum.U12, gender=GenderEnum.FEMALE)
+        db.add_all([competition, race, category])
+        for i, athlete in enumerate(athletes):
+            finished = i % 10 != 9
+            db.add(Result(
+                id=f"res{c}-{i:02d}", athlete_id=athlete.id, competition_id=competition.id,
+                event_id=race.id, category_id=category.id,
+                total_time=f"1:{10 + i:02d}.{c:02d}" if finished else None,
+                rank=i + 1 if finished else None,
+                status=ResultStatusEnum.COMPLETED if finished else ResultStatusEnum.DNF,
+            ))
+    db.commit()
+    db.close()
+    yield engine
+    engine.dispose()
+
+
+def _count_statements(engine, params: QueryParams):
+    """清空查询缓存后执行一次 search_results，返回 (执行的 SQL 条数, 响应)"""
+    query_service.result_cache.clear()
+    query_service.count_cache.clear()
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    db = sessionmaker(bind=engine)()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        response = QueryService(db).search_results(params)
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+        db.close()
+    return len(statements), response
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"sort": "total_time"},
+    {"athlete_name": "知涵", "organization": "俱乐部"},
+    {"season": "2023-2024", "count": "estimate"},
+])
+def test_statement_count_independent_of_page_size(engine, filters):
+    counts = {}
+    for page_size in (1, 20, 100):
+        counts[page_size], response = _count_statements(engine, QueryParams(page_size=page_size, **filters))
+        assert len(response.results) == min(page_size, response.total)
+
+    assert response.total > 0
+    assert len(set(counts.values())) == 1, counts
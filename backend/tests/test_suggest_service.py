@@ -0,0 +1,22 @@
+# 输入提示索引测试：多音字姓氏的全拼和首字母
+from services.suggest_service import SuggestIndex, search_keys
+
+
+def test_search_keys_cover_every_surname_reading():
+    keys = search_keys("曾凡博")
+    assert {"曾凡博", "zengfanbo", "zfb", "cengfanbo", "cfb"} <= set(keys)
+    assert {"shanxue", "sx", "danxue"} <= set(search_keys("单雪"))
+
+
+def test_suggest_matches_heteronym_surname():
+    index = SuggestIndex()
+    index.add("athlete", "a1", "曾凡博", "海淀区")
+    index.add("athlete", "a2", "解晓", None)
+
+    for prefix in ("zfb", "zengf", "cengfanbo", "曾凡"):
+        assert [item.id for item in index.suggest(prefix)] == ["a1"], prefix
+    assert [item.id for item in index.suggest("xiex")] == ["a2"]
+
+    index.remove("athlete", "a1")
+    assert index.suggest("zfb") == []
+    assert len(index) == 1